@@ -20,6 +20,7 @@ from src.dataloader import ReutersAPIDataLoader
 from src.clip_manager import ClipManager
 from src.news_script import NewsScript
 from src.video_editor import VideoEditor
+from src.render_profiles import queue_render
 from src.error_handler import StreamlitErrorHandler
 from src.audio_processor import AudioProcessor
 from src.authentication import check_password
@@ -70,8 +71,8 @@ def run():
         st.session_state["high_res_anchor"] = False
     if "music" not in st.session_state:
         st.session_state["music"] = True
-    if "high_res" not in st.session_state:
-        st.session_state["high_res"] = False
+    if "final_render" not in st.session_state:
+        st.session_state["final_render"] = None
     
     def on_change(var_name):
         def _toggle():
@@ -242,24 +243,21 @@ def run():
             if section.match_type == "CLIP":
                 st.warning(f"SOT Section {section.id}'s had no detected speech. Adding entire clip.")
         
-        def reset_video_and_toggle():
-            st.session_state["video_run"] = False
-            st.session_state["video_ran"] = False
-
-            st.session_state["high_res"] = not st.session_state["high_res"]
-        
-        high_res = st.toggle("High Resolution", value=st.session_state["high_res"], on_change=reset_video_and_toggle)
-        output_resolution = (1920, 1080) if high_res else (640, 360)
-        bitrate = "10M" if high_res else "1M"
+        final_profile = st.selectbox("Final Render Quality", ["broadcast", "review"])
 
         if not st.session_state["video_run"]:
-            if st.button("Generate Video"):
+            if st.button("Generate Preview"):
                 st.session_state["video_run"] = True
         else:
-            if st.button("Regenerate Video"):
+            if st.button("Regenerate Preview"):
                 st.session_state["video_ran"] = False
+                st.session_state["final_render"] = None
         
+        def create_video_editor(render_profile, error_handler):
+            return VideoEditor(combined_script, clip_manager, live_anchor, test_mode, music, Path("./assets/music-1.mp3"), logo_path=Path("./assets/lower_thirds_logo.png"), font=Path("./assets/Khand-SemiBold.ttf"), error_handler=error_handler, render_backend="ffmpeg-parallel", render_profile=render_profile)
+
         if st.session_state["video_run"]:
+            video_output_file = story_folder / "preview.mp4"
             with st.status("Running"):
                 if not st.session_state["video_ran"]:
                     audio_processor = AudioProcessor(combined_script, clip_manager, story_folder, error_handler)
@@ -276,13 +274,10 @@ def run():
                         error_handler.info("Adding broll placements")
                     audio_processor._add_broll_placements()
 
-                    st.write("Assembling video")
-                    error_handler.info("Assembling video")
-                    video_output_file = story_folder / "output.mp4"
-                    video_editor = VideoEditor(combined_script, clip_manager, live_anchor, test_mode, music, Path("./assets/music-1.mp3"), output_resolution=output_resolution, bitrate=bitrate, logo_path=Path("./assets/lower_thirds_logo.png"), font=Path("./assets/Khand-SemiBold.ttf"), error_handler=error_handler)
+                    st.write("Assembling preview")
+                    error_handler.info("Assembling preview")
+                    video_editor = create_video_editor("draft", error_handler)
                     video_editor.assemble_video(output_file=video_output_file)
-                else:
-                    video_output_file = story_folder / "output.mp4"
             
             st.session_state["video_ran"] = True
             
@@ -291,6 +286,23 @@ def run():
 
             st.video(str(video_output_file), autoplay=True)
 
+            # The final encode only runs once the preview is approved, in the background
+            if st.button("Approve and Render Final"):
+                final_output_file = story_folder / f"output_{final_profile}.mp4"
+                # Streamlit elements can't be updated from the render thread, so no error handler
+                st.session_state["final_render"] = (final_output_file, queue_render(create_video_editor(final_profile, None), final_output_file))
+
+            if st.session_state["final_render"] is not None:
+                final_output_file, final_render = st.session_state["final_render"]
+                if not final_render.done():
+                    st.info(f"Rendering {final_output_file.name} in the background")
+                    st.button("Check Final Render")
+                elif final_render.exception() is not None:
+                    st.error(f"Final render failed: {final_render.exception()}")
+                else:
+                    with open(final_output_file, "rb") as f:
+                        st.download_button("Download Final Video", f, file_name=final_output_file.name, mime="video/mp4")
+
 
 if __name__ == "__main__":
     run()
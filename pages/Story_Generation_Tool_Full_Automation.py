@@ -72,8 +72,6 @@ def run():
         st.session_state["high_res_anchor"] = False
     if "music" not in st.session_state:
         st.session_state["music"] = False
-    if "high_res" not in st.session_state:
-        st.session_state["high_res"] = False
     
     def on_change(var_name):
         def _toggle():
@@ -87,9 +85,7 @@ def run():
     high_res_anchor = st.toggle("High Res Anchor", value=st.session_state["high_res_anchor"], on_change=on_change("high_res_anchor"))
     music = st.toggle("Add Music", value=st.session_state["music"], on_change=on_change("music"))
     test_mode = not high_res_anchor
-    high_res = st.toggle("High Resolution", value=st.session_state["high_res"], on_change=on_change("high_res"))
-    output_resolution = (1920, 1080) if high_res else (640, 360)
-    bitrate = "10M" if high_res else "1M"
+    render_profile = st.selectbox("Render Quality", ["draft", "review", "broadcast"])
 
     languages = ["English", "Spanish", "French", "German", "Polish", "Italian", "Portuguese", "Russian", "Arabic", "Dutch", "Swedish", "Norwegian", "Turkish", "Japanese", "Korean", "Filipino", "Tamil", "Indonesian", "Greek", "Chinese"]
     language = st.selectbox("Generate Story In:", languages)
@@ -261,7 +257,7 @@ def run():
                     st.write("Assembling video")
                     error_handler.info("Assembling video")
                     video_output_file = story_folder / "output.mp4"
-                    video_editor = VideoEditor(combined_script, clip_manager, live_anchor, test_mode, music, Path("./assets/music-1.mp3"), output_resolution=output_resolution, bitrate=bitrate, logo_path=Path("./assets/lower_thirds_logo.png"), font=Path("./assets/Khand-SemiBold.ttf"), error_handler=error_handler)
+                    video_editor = VideoEditor(combined_script, clip_manager, live_anchor, test_mode, music, Path("./assets/music-1.mp3"), logo_path=Path("./assets/lower_thirds_logo.png"), font=Path("./assets/Khand-SemiBold.ttf"), error_handler=error_handler, render_profile=render_profile)
                     video_editor.assemble_video(output_file=video_output_file)
                 else:
                     video_output_file = story_folder / "output.mp4"
@@ -9,6 +9,8 @@ from src.video_editor import VideoEditor
 from src.error_handler import StdOutErrorHandler 
 from src.audio_processor import AudioProcessor
 from src.gcp import GCSManager
+from src.llm_cache import llm_cache
+from src.pipeline import Pipeline
 
 def main():
     anchor_idx = int(os.environ.get("ANCHOR_INDEX", random.randint(0, 2)))
@@ -18,6 +20,8 @@ def main():
     add_logline = os.environ.get("ADD_LOGLINE", "false").lower() == "true"
     add_courtesy = os.environ.get("ADD_COURTESY", "false").lower() == "true"
     edit = os.environ.get("EDIT", "false").lower() == "true"
+    render_backend = os.environ.get("RENDER_BACKEND", "moviepy").lower()
+    render_profile = os.environ.get("RENDER_PROFILE") # draft, review or broadcast, overrides the resolution/bitrate below
 
     anchor_map = [
         ("yELTnbNFhESclGsoYVTM", "l6Qo5Atx1JTwyCLkMKQm", "6afc5b115c6f440aa92f43a32f50616f", "assets/EDDIE-square.png"),
@@ -53,31 +57,33 @@ def main():
     clips_folder = story_folder / "clips"
     clip_manager = ClipManager(video_file_path, clips_folder, shotlist, anchor_image_path, anchor_voice_id, voiceover_voice_id, anchor_avatar_id, has_splash_screen=False, error_handler=error_handler)
     script = NewsScript(storyline, shotlist, clip_manager, dataloader, folder=story_folder, error_handler=error_handler)
-    print("Splitting video into clips")
-    clip_manager.split_video_into_clips()
-    print("Loading clips")
-    clip_manager.load_clips()
-    print("Transcribing clips")
-    clip_manager.transcribe_clips(multi=True)
-    print("Matching clips")
-    clip_manager.match_clips()
-    print("Breaking up clips")
-    clip_manager.break_up_clips()
-    print("Applying courtesy to clips")
-    clip_manager.courtesy_clips(body)
-    print("Generating full descriptions")
-    clip_manager.generate_full_descriptions(story_title)
-    
-    print("Spell checking")
-    script.spell_check()
-    print("Generating facts")
-    script.generate_facts()
-    print("Generating script")
-    script.generate_script(edit=edit)
-    print("Generating lower thirds")
-    script.generate_lower_thirds()
-    print("Matching SOT clips")
-    script.match_sot_clips()
+    def process_clips():
+        print("Splitting video into clips")
+        clip_manager.split_video_into_clips()
+        print("Loading clips")
+        clip_manager.load_clips()
+        print("Transcribing clips")
+        clip_manager.transcribe_clips(multi=True)
+        print("Matching clips")
+        clip_manager.match_clips()
+        print("Breaking up clips")
+        clip_manager.break_up_clips()
+
+    # Steps start as soon as what they depend on is done, so the clip analysis and the script are written side by side
+    pipeline = Pipeline(error_handler=error_handler)
+    pipeline.add("clips", process_clips)
+    pipeline.add("courtesies", lambda: clip_manager.get_courtesies(body))
+    pipeline.add("apply_courtesies", lambda: clip_manager.apply_courtesies(pipeline.results["courtesies"]), depends_on=["clips", "courtesies"])
+    pipeline.add("descriptions", lambda: clip_manager.generate_full_descriptions(story_title), depends_on=["clips"])
+    pipeline.add("spell_check_storyline", script.spell_check_storyline)
+    pipeline.add("spell_check_shotlist", script.spell_check_shotlist)
+    pipeline.add("facts", script.generate_facts, depends_on=["spell_check_storyline", "spell_check_shotlist"])
+    pipeline.add("script", lambda: script.generate_script(edit=edit), depends_on=["spell_check_storyline", "spell_check_shotlist"])
+    pipeline.add("headline", script.generate_headline, depends_on=["script"])
+    pipeline.add("loglines", script.generate_loglines, depends_on=["script"])
+    pipeline.add("bylines", script.generate_bylines, depends_on=["script"])
+    pipeline.add("match_sot_clips", script.match_sot_clips, depends_on=["bylines", "clips"])
+    pipeline.run()
 
     audio_processor = AudioProcessor(script, clip_manager, story_folder, error_handler)
     print("Processing anchor audio")
@@ -92,9 +98,10 @@ def main():
     audio_processor._generate_anchor(live_anchor, test_mode)
 
     video_output_file = story_folder / "output.mp4"
-    video_editor = VideoEditor(script, clip_manager, live_anchor, test_mode, music, Path("./assets/music-1.mp3"), output_resolution=output_resolution, bitrate=bitrate, logo_path=Path("./assets/lower_thirds_logo.png"), font=Path("./assets/Khand-SemiBold.ttf"), add_logline=add_logline, add_courtesy=add_courtesy, error_handler=error_handler)
+    video_editor = VideoEditor(script, clip_manager, live_anchor, test_mode, music, Path("./assets/music-1.mp3"), output_resolution=output_resolution, bitrate=bitrate, logo_path=Path("./assets/lower_thirds_logo.png"), font=Path("./assets/Khand-SemiBold.ttf"), add_logline=add_logline, add_courtesy=add_courtesy, error_handler=error_handler, render_backend=render_backend, render_profile=render_profile)
     print("Assembling video")
     video_editor.assemble_video(output_file=video_output_file)
+    print(llm_cache.stats())
 
     gcs = GCSManager()
     print("Uploading video to GCS")
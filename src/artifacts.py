@@ -0,0 +1,98 @@
+# Artifacts
+
+# STREAMLIT
+from src.prompts import run_chain, run_chain_json, spell_check_chain, get_sot_chain, parse_sot_chain, facts_chain, courtesy_chain
+# /STREAMLIT
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+import threading
+
+_MISSING = object()
+
+@dataclass
+class Artifact:
+    compute: Callable[["ArtifactStore"], Any]
+    depends_on: List[str] = field(default_factory=list)
+    value: Any = _MISSING
+    # Bumped whenever the artifact is invalidated, so a computation that raced with it is dropped
+    generation: int = 0
+
+class ArtifactStore:
+    """Results derived from a story's inputs, computed at most once and shared by every stage.
+
+    Inputs are set by name; artifacts are defined with the names they are computed from and
+    computed on first use. Changing an input invalidates everything derived from it.
+    """
+
+    def __init__(self):
+        self._inputs: Dict[str, Any] = {}
+        self._artifacts: Dict[str, Artifact] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.RLock()
+
+    def define(self, name: str, compute: Callable[["ArtifactStore"], Any], depends_on: List[str]):
+        with self._lock:
+            self._artifacts[name] = Artifact(compute, list(depends_on))
+            self._locks[name] = threading.Lock()
+
+    def set_input(self, name: str, value: Any):
+        """Sets an input, invalidating what was derived from it if the value changed."""
+        with self._lock:
+            if name in self._inputs and self._inputs[name] == value:
+                return
+            self._inputs[name] = value
+            self.invalidate(name)
+
+    def set_default(self, name: str, value: Any):
+        """Sets an input only if no stage has set it yet."""
+        with self._lock:
+            if name not in self._inputs:
+                self._inputs[name] = value
+
+    def invalidate(self, name: str):
+        """Drops every artifact computed from name, directly or indirectly, including ones being computed."""
+        with self._lock:
+            for artifact_name, artifact in self._artifacts.items():
+                if name in artifact.depends_on:
+                    artifact.value = _MISSING
+                    artifact.generation += 1
+                    self.invalidate(artifact_name)
+
+    def get(self, name: str) -> Any:
+        """Returns an input, or an artifact, computing it (and what it depends on) if needed."""
+        with self._lock:
+            if name in self._inputs:
+                return self._inputs[name]
+            if name not in self._artifacts:
+                raise KeyError(f"Unknown artifact or missing input: {name}")
+            artifact = self._artifacts[name]
+            lock = self._locks[name]
+
+        # Only one stage computes an artifact, the others wait for its result
+        with lock:
+            while True:
+                with self._lock:
+                    if artifact.value is not _MISSING:
+                        return artifact.value
+                    generation = artifact.generation
+                value = artifact.compute(self)
+                with self._lock:
+                    # An input changed while computing, the value is stale so compute it again
+                    if artifact.generation == generation:
+                        artifact.value = value
+                        return value
+
+def story_artifacts() -> ArtifactStore:
+    """The artifacts shared by ClipManager and NewsScript for one story.
+
+    Inputs: raw_storyline, raw_shotlist and body.
+    """
+    artifacts = ArtifactStore()
+    artifacts.define("storyline", lambda a: run_chain(spell_check_chain, {"INPUT": a.get("raw_storyline")}), ["raw_storyline"])
+    artifacts.define("shotlist", lambda a: run_chain(spell_check_chain, {"INPUT": a.get("raw_shotlist")}), ["raw_shotlist"])
+    artifacts.define("sots", lambda a: run_chain(get_sot_chain, {"SHOTLIST": a.get("shotlist")}), ["shotlist"])
+    artifacts.define("parsed_sots", lambda a: run_chain_json(parse_sot_chain, {"QUOTES": a.get("sots")}), ["sots"])
+    artifacts.define("facts", lambda a: run_chain(facts_chain, {"SCRIPT": a.get("storyline"), "SHOTLIST": a.get("shotlist")}), ["storyline", "shotlist"])
+    artifacts.define("courtesies", lambda a: run_chain_json(courtesy_chain, {"BODY": a.get("body")}), ["body"])
+    return artifacts
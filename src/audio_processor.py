@@ -9,6 +9,7 @@ from src.gemini import add_broll, add_broll_clips
 from src.language import Language
 from src.heygen import animate_anchor
 from src.transcription import WhisperResults
+from src.response_schemas import BrollPlacementsResponse
 
 import streamlit as st
 # /STREAMLIT
@@ -133,7 +134,7 @@ class AudioProcessor:
         broll_placements = add_broll_clips(self.anchor_audio_file, self.clip_manager.clips, self.news_script.get_sot_clip_ids(), sections_str)
         # broll_placements = run_chain(broll_chain, {"BROLL_DESCRIPTIONS": full_descriptions_str, "SECTION_TIMINGS": sections_str})
         
-        parsed_broll_json = run_chain_json(parse_broll_chain, {"SECTIONS": sections_str, "BROLL_PLACEMENTS": broll_placements})
+        parsed_broll_json = run_chain_json(parse_broll_chain, {"SECTIONS": sections_str, "BROLL_PLACEMENTS": broll_placements}, _schema=BrollPlacementsResponse)
 
         if self.error_handler:
             self.error_handler.stream_status(broll_placements, "Placing BROLL")
@@ -480,8 +481,6 @@ class AudioProcessor:
                         self.error_handler.stream_status(section.text, title="Generated anchor video", video=anchor_video_file)
                     section.anchor_video_file = anchor_video_file
                 else:
-                    anchor_clip = self.clip_manager.get_anchor_image_clip()
-                    anchor_clip = anchor_clip.set_duration(section.anchor_audio_clip.duration)
-                    anchor_clip.write_videofile(str(anchor_video_file), fps=29.97, threads=8,
-                                    bitrate="10M", logger=None)
-                    section.anchor_video_file = anchor_video_file
+                    # Still anchors are looped directly into the final render, no need to encode them here
+                    section.anchor_image_file = Path(self.clip_manager.anchor_image_path)
+                    section.anchor_video_file = None
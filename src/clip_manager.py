@@ -1,32 +1,105 @@
 # ClipManager
 
 # STREAMLIT
-from src.transcription import WhisperResults
-from src.prompts import run_chain, run_chain_json, match_clip_to_sots_chain, get_sot_chain, courtesy_chain
+from src.transcription import WhisperResults, Transcript, openai_translate
+from src.transcription_cache import transcription_cache
+from src.prompts import run_chain, run_chain_json, match_clip_to_sots_chain, translate_transcripts_chain
+from src.artifacts import ArtifactStore, story_artifacts
+from src.response_schemas import SotMatchesResponse
+from src.probe import probe_media
+from src.clip_ranges import ClipRange, materialize, extract_audio, extract_frame
+from src.request_scheduler import get_limiter
+from src.vad import has_speech
 import streamlit as st
 # /STREAMLIT
 
 from pathlib import Path
 from typing import List, Dict, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import moviepy.editor as mp
+import threading
 import traceback
+import json
 import copy
 import os
 
+SCENES_FILE = "scenes.json"
+MASTER_TRANSCRIPT_FILE = "master_transcript.json"
+# Parts of split clips, outside the *.mp4 glob load_clips reads clips from
+PARTS_FOLDER = "parts"
+
+def normalize_clip_id(clip_id) -> str:
+    """Clip id as written by an LLM or by us, e.g. 1, "01" and "001" are the same clip."""
+    return "_".join(str(int(part)) if part.isdigit() else part for part in str(clip_id).strip().split("_"))
+
 def folder_has_no_videos(folder_path: Path) -> bool:
     return not list(folder_path.glob("*.mp4"))
 
+class ClipReaderPool:
+    """Opens each video file once and shares the reader between every placement of it.
+
+    Subclips created from a pooled clip keep using the parent's reader, which seeks to
+    their range on demand, so repeated placements don't spawn more FFmpeg processes.
+    Readers stay open until close(), typically once the render has finished.
+    """
+
+    def __init__(self):
+        self.readers: Dict[Path, mp.VideoFileClip] = {}
+        self.lock = threading.Lock()
+
+    def get(self, file_path: Path) -> mp.VideoFileClip:
+        """Returns the shared clip for a file, opening it on first use."""
+        key = Path(file_path).resolve()
+        with self.lock:
+            if key not in self.readers:
+                self.readers[key] = mp.VideoFileClip(str(file_path))
+            return self.readers[key]
+
+    def subclip(self, file_path: Path, start: float = 0, end: Optional[float] = None) -> mp.VideoFileClip:
+        """Returns a sub-range of the shared clip, clamped to its duration."""
+        clip = self.get(file_path)
+        end = clip.duration if end is None else min(end, clip.duration)
+        return clip.subclip(min(start, end), end)
+
+    def release(self, file_path: Path):
+        """Closes the reader for a single file, e.g. before the file is replaced."""
+        with self.lock:
+            clip = self.readers.pop(Path(file_path).resolve(), None)
+        if clip is not None:
+            clip.close()
+
+    def close(self):
+        """Closes every open reader."""
+        with self.lock:
+            readers, self.readers = self.readers, {}
+        for clip in readers.values():
+            clip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def __deepcopy__(self, memo):
+        # Readers wrap running processes and can't be copied, a copy starts empty
+        return ClipReaderPool()
+
 class Clip:
     """Represents a single video clip."""
 
-    def __init__(self, clip_id: str, clip_file: Path, clips_folder: Path, error_handler = None):
+    def __init__(self, clip_id: str, clip_file: Path, clips_folder: Path, error_handler = None, clip_range: Optional[ClipRange] = None):
         self.id = clip_id
-        self.file_path = clip_file
+        self._file_path = clip_file
+        self.clip_range = clip_range
         self.clips_folder = clips_folder
         self.error_handler = error_handler
 
-        self.duration = self.load_video().duration
+        if clip_range is not None:
+            self.duration = clip_range.duration
+        else:
+            # Probe results are indexed in the story folder, so this doesn't open a decoder
+            self.duration = probe_media(self._file_path, index_folder=self.clips_folder.parent).duration
 
         self.shot_id: Optional[int] = None
         self.shotlist_description: Optional[str] = None
@@ -38,22 +111,81 @@ class Clip:
     def __repr__(self):
         return f"""{self.id} ({self.shot_id}, quote: {self.has_quote}, courtesy: {self.courtesy}): {self.shotlist_description}"""
 
+    @property
+    def file_path(self) -> Path:
+        """The clip's own video file. Clips backed by a range of the master are extracted on first access."""
+        if self.clip_range is not None and not self._file_path.exists():
+            materialize(self.clip_range, self._file_path, error_handler=self.error_handler)
+        return self._file_path
+
+    @file_path.setter
+    def file_path(self, file_path: Path):
+        # A new physical file replaces the range it may have been extracted from
+        self._file_path = file_path
+        self.clip_range = None
+
+    @property
+    def existing_file_path(self) -> Optional[Path]:
+        """The clip's own video file if it's already on disk, for previews that shouldn't extract it."""
+        return self._file_path if self._file_path.exists() else None
+
+    @property
+    def source_range(self) -> ClipRange:
+        """The clip as a range of a video file, either its range of the master or its whole file."""
+        if self.clip_range is not None:
+            return self.clip_range
+        return ClipRange(self._file_path, 0.0, self.duration)
+
+    def sidecar_file(self, suffix: str) -> Path:
+        """Path for a file derived from the clip (frames, audio), without extracting the clip itself."""
+        return self._file_path.with_suffix(suffix)
+
+    def extract_frame(self, time: float, output_file: Optional[Path] = None) -> Path:
+        """Saves a single frame of the clip, read straight from its source range."""
+        return extract_frame(self.source_range, time, output_file or self.sidecar_file(".jpg"))
+
+    def extract_audio(self) -> Path:
+        """Writes the clip's audio to an mp3 next to it, read straight from its source range."""
+        audio_file_path = self.sidecar_file(".mp3")
+        if not audio_file_path.exists():
+            extract_audio(self.source_range, audio_file_path)
+        return audio_file_path
+
     def load_video(self) -> mp.VideoFileClip:
-        """Loads the video clip using moviepy."""
+        """Loads the video clip using moviepy. The caller owns (and should close) the reader."""
         return mp.VideoFileClip(str(self.file_path))
 
-    def transcribe_clip(self):
-        """Performs speech recognition on the clip's audio."""
+    def transcribe_clip(self, transcript: Optional[Transcript] = None, vad: bool = True, translate: bool = True, single_language: bool = False):
+        """Performs speech recognition on the clip's audio, or slices it from the transcript of its source.
+
+        The transcript of the source only settles clips without words in it, unless single_language
+        says the source's detected language holds for every clip. Clips with speech are otherwise
+        transcribed on their own, so each gets its own language.
+        With vad, clips with no voice in them are marked as having no speech without calling the API.
+        Without translate, non-English speech is left for translate_clips to translate in a batch.
+        """
         try:
-            audio_file_path = self.file_path.with_suffix('.mp3')
-            video = self.load_video()
-            video.audio.write_audiofile(str(audio_file_path))
+            if transcript is not None:
+                source = self.source_range
+                if single_language or not transcript.words_between(source.start, source.end):
+                    self.whisper_results = WhisperResults.from_transcript(transcript, source.start, source.end, self.extract_audio, translate=translate)
+                    return
+
+            if vad and not has_speech(self.source_range):
+                self.whisper_results = WhisperResults.no_speech()
+                return
+
+            audio_file_path = self.extract_audio()
             
-            self.whisper_results = WhisperResults.from_file(audio_file_path)
+            self.whisper_results = WhisperResults.from_file(audio_file_path, translate=translate)
         except Exception as e:
             self.whisper_results = WhisperResults("", [], 1.0, False, "Unknown", "")
             raise e
 
+    def translate_audio(self):
+        """Translates the clip's speech from its audio with Whisper."""
+        self.whisper_results.english_text = openai_translate(self.extract_audio().resolve())
+
     def generate_full_description(self, story_title: str):
         """Generates a detailed description of the clip."""
         description_file = self.clips_folder / "descriptions" / f"{self.id}.txt"
@@ -74,7 +206,7 @@ class Clip:
 class ClipManager:
     """Manages video clips, including splitting, description, and speech recognition."""
 
-    def __init__(self, video_file_path: Path, clips_folder: Path, shotlist: str, anchor_image_path: Path, anchor_voice_id: str, voiceover_voice_id: str, anchor_avatar_id: str, has_splash_screen: bool = False, error_handler = None):
+    def __init__(self, video_file_path: Path, clips_folder: Path, shotlist: str, anchor_image_path: Path, anchor_voice_id: str, voiceover_voice_id: str, anchor_avatar_id: str, has_splash_screen: bool = False, error_handler = None, scene_frame_skip: int = 0, scene_workers: Optional[int] = None, artifacts: Optional[ArtifactStore] = None):
         self.video_file_path = video_file_path
         self.clips_folder = clips_folder
         self.shotlist = shotlist
@@ -84,37 +216,131 @@ class ClipManager:
         self.anchor_avatar_id = anchor_avatar_id
         self.has_splash_screen = has_splash_screen
         self.error_handler = error_handler
+        self.scene_frame_skip = scene_frame_skip
+        self.scene_workers = scene_workers
+        # Derived results of the story (SOTs, courtesies, ...) shared with the NewsScript
+        self.artifacts = artifacts or story_artifacts()
+        self.artifacts.set_default("raw_shotlist", shotlist)
+        self.master_transcript: Optional[Transcript] = None
+        self.transcribe_from_master = True
+        self.use_vad = True
+        self.single_language = False
+        self.translations: Optional[Future] = None
+        self._transcript_lock = threading.Lock()
         self.clips: List[Clip] = []
+        self.reader_pool = ClipReaderPool()
 
     def split_video_into_clips(self):
-        """Splits the main video into clips based on scene detection."""
+        """Splits the main video into clips based on scene detection.
+
+        Scenes are recorded as ranges of the main video in scenes.json, clip files are only
+        extracted (losslessly where possible) when something needs them.
+        """
         self.clips_folder.mkdir(parents=True, exist_ok=True)
-        if folder_has_no_videos(self.clips_folder):
-            from scenedetect import detect, AdaptiveDetector, split_video_ffmpeg
+        scenes_file = self.clips_folder / SCENES_FILE
+        if folder_has_no_videos(self.clips_folder) and not scenes_file.exists():
+            from scenedetect import AdaptiveDetector
+            from src.scene_detection import detect_scenes
 
-            clip = mp.VideoFileClip(str(self.video_file_path))
-            fps = clip.fps
-            clip.close()
+            fps = probe_media(self.video_file_path, index_folder=self.clips_folder.parent).fps
 
-            scene_list = detect(str(self.video_file_path), AdaptiveDetector(adaptive_threshold=4, min_scene_len=fps))
+            # Detection runs on a downscaled stream in parallel chunks, optionally skipping frames and refining cuts afterwards
+            scene_list = detect_scenes(self.video_file_path, AdaptiveDetector(adaptive_threshold=4, min_scene_len=fps),
+                                       frame_skip=self.scene_frame_skip, index_folder=self.clips_folder.parent,
+                                       workers=self.scene_workers)
             if scene_list:
-                status = split_video_ffmpeg(str(self.video_file_path), scene_list, show_progress=False,
-                                output_file_template=str(self.clips_folder / "$SCENE_NUMBER.mp4"))
-                if status != 0:
+                scenes = [{"id": f"{i+1:03d}", **ClipRange(self.video_file_path, start.get_seconds(), end.get_seconds()).to_dict()}
+                          for i, (start, end) in enumerate(scene_list)]
+                self._save_scenes(scenes)
+                try:
+                    self.refine_scene_boundaries()
+                except Exception as e:
+                    # The detected scenes are usable as they are
                     if self.error_handler:
-                        self.error_handler.error(f"ERROR: Splitting video into clips failed with code: {status}")
+                        self.error_handler.warning(f"WARNING: Could not refine scene boundaries with the transcript, keeping the detected scenes. ({e})")
             else:
                 self.video_file_path.rename(self.clips_folder / "001.mp4")
         if self.error_handler:
-            self.error_handler.info(f"Detected {len(list(self.clips_folder.glob('*.mp4')))} clips")
+            self.error_handler.info(f"Detected {len(self._load_scenes() or list(self.clips_folder.glob('*.mp4')))} clips")
+
+    def _load_scenes(self) -> Optional[List[Dict]]:
+        scenes_file = self.clips_folder / SCENES_FILE
+        if not scenes_file.exists():
+            return None
+        with open(scenes_file, "r") as f:
+            return json.load(f)
+
+    def _save_scenes(self, scenes: List[Dict]):
+        with open(self.clips_folder / SCENES_FILE, "w") as f:
+            json.dump(scenes, f, indent=2)
+
+    def transcribe_master(self) -> Transcript:
+        """Transcribes the whole main video once, cached next to the clips."""
+        with self._transcript_lock:
+            if self.master_transcript is not None:
+                return self.master_transcript
+            transcript_file = self.clips_folder / MASTER_TRANSCRIPT_FILE
+            if transcript_file.exists():
+                self.master_transcript = Transcript.load(transcript_file)
+                return self.master_transcript
+            duration = probe_media(self.video_file_path, index_folder=self.clips_folder.parent).duration
+            master_range = ClipRange(self.video_file_path, 0.0, duration)
+            if self.use_vad and not has_speech(master_range):
+                # Natural sound only, there are no words to transcribe. Not saved, so a later run
+                # (e.g. without VAD) checks again rather than losing the speech of every clip
+                self.master_transcript = Transcript([], 0.0, None)
+                return self.master_transcript
+            audio_file = self.clips_folder / "master.mp3"
+            if not audio_file.exists():
+                extract_audio(master_range, audio_file)
+            transcript = Transcript.from_file(audio_file)
+            transcript.save(transcript_file)
+            self.master_transcript = transcript
+            return transcript
+
+    def _master_transcript_for(self, clip: Clip) -> Optional[Transcript]:
+        """The main video's transcript if the clip is a range of it, so its words can be sliced out."""
+        if clip.clip_range is None or clip.clip_range.source_file != self.video_file_path:
+            return None
+        return self.transcribe_master()
+
+    def refine_scene_boundaries(self):
+        """Merges neighbouring scenes whose cut falls in the middle of a sentence.
+
+        Cuts are checked against word timings of the main video's audio, so a quote that spans
+        a cut becomes one range before anything is transcribed or extracted.
+        """
+        scenes = self._load_scenes()
+        if not scenes or len(scenes) < 2:
+            return
+        transcript = self.transcribe_master()
+
+        merged = [scenes[0]]
+        for scene in scenes[1:]:
+            if transcript.splits_sentence(scene["start"]):
+                previous = merged[-1]
+                merged[-1] = {**previous, "id": f"{previous['id']}_{scene['id']}", "end": scene["end"]}
+            else:
+                merged.append(scene)
+
+        if len(merged) < len(scenes):
+            self._save_scenes(merged)
+            if self.error_handler:
+                self.error_handler.info(f"Merged {len(scenes) - len(merged)} cuts that split a sentence")
 
     def load_clips(self):
-        self.clips = [Clip(file.stem, file, self.clips_folder, error_handler=self.error_handler) for file in sorted(self.clips_folder.glob("*.mp4"))]
+        scenes = self._load_scenes()
+        if scenes is not None:
+            self.clips = [Clip(scene["id"], self.clips_folder / f"{scene['id']}.mp4", self.clips_folder,
+                               error_handler=self.error_handler, clip_range=ClipRange.from_dict(scene)) for scene in scenes]
+        else:
+            self.clips = [Clip(file.stem, file, self.clips_folder, error_handler=self.error_handler) for file in sorted(self.clips_folder.glob("*.mp4"))]
         if self.has_splash_screen:
             self.clips = self.clips[1:]
 
     def match_clips(self):
-        sot_matches = run_chain_json(match_clip_to_sots_chain, {"SOTS": self._extract_sots(), "CLIPS_WITH_TRANSCRIPTS": self.get_quotes_str()})
+        self.wait_for_translations()
+        sot_matches = run_chain_json(match_clip_to_sots_chain, {"SOTS": self._extract_sots(), "CLIPS_WITH_TRANSCRIPTS": self.get_quotes_str()}, _schema=SotMatchesResponse)
 
         for sot_match in sot_matches["matches"]:
             try:
@@ -168,7 +394,7 @@ class ClipManager:
                 combined_clip = self.combine_clips(group)
                 combined_clips.append(combined_clip)
                 if self.error_handler:
-                    self.error_handler.stream_status(combined_clip.whisper_results.english_text, f"Combined clips ({combined_clip.id}) with same sot ({current_clip.shot_id})", video=combined_clip.file_path)
+                    self.error_handler.stream_status(combined_clip.whisper_results.english_text, f"Combined clips ({combined_clip.id}) with same sot ({current_clip.shot_id})", video=combined_clip.existing_file_path)
             else:
                 combined_clips.append(current_clip)
             
@@ -272,6 +498,19 @@ class ClipManager:
         if len(clips) == 1:
             return clips[0]
 
+        new_id = "_".join([clip.id for clip in clips])
+        ranges = [clip.clip_range for clip in clips]
+        if all(ranges) and len({clip_range.source_file for clip_range in ranges}) == 1:
+            # Neighbouring ranges of the same source combine into one range, nothing is encoded
+            for clip in clips:
+                clip._file_path.unlink(missing_ok=True)
+            clips[0].id = new_id
+            clips[0]._file_path = self.clips_folder / f"{new_id}.mp4"
+            clips[0].clip_range = ClipRange(ranges[0].source_file, ranges[0].start, ranges[-1].end)
+            clips[0].duration = clips[0].clip_range.duration
+            clips[0].transcribe_clip(self._master_transcript_for(clips[0]) if self.transcribe_from_master else None, vad=self.use_vad, single_language=self.single_language)
+            return clips[0]
+
         # Load all video clips
         video_clips = [clip.load_video() for clip in clips]
 
@@ -281,12 +520,13 @@ class ClipManager:
         combined_video = mp.concatenate_videoclips(video_clips, method="compose")
 
         # Generate the new file name
-        new_id = "_".join([clip.file_path.stem for clip in clips])
         new_file_name = new_id + ".mp4"
         new_file_path = self.clips_folder / new_file_name
 
         # Write the combined video to the new file
         combined_video.write_videofile(str(new_file_path), logger=None)
+        for video_clip in video_clips:
+            video_clip.close()
 
         # Delete the original clip files
         for clip in clips:
@@ -296,26 +536,51 @@ class ClipManager:
         clips[0].id = new_id
         clips[0].file_path = new_file_path
         clips[0].duration = combined_video.duration
-        clips[0].transcribe_clip()
+        clips[0].transcribe_clip(vad=self.use_vad)
         return clips[0]
 
     def _extract_sots(self) -> str:
         """Extracts and parses soundbites (SOTs) from the shotlist."""
-        sots = run_chain(get_sot_chain, {"SHOTLIST": self.shotlist})
-        return sots
-
-    def transcribe_clips(self, multi: bool = True):
+        return self.artifacts.get("sots")
+
+    def transcribe_clips(self, multi: bool = True, from_master: bool = True, vad: bool = True, batch_translate: bool = True, single_language: bool = False):
+        """Transcribes every clip.
+
+        With from_master, the main video is transcribed once and clips that are ranges of it with
+        no words in that transcript need no API call; other clips are transcribed on their own.
+        With single_language (a package in one language), clips with speech also take their words
+        and language from the main video's transcript instead of being transcribed. With vad,
+        audio without voice in it is skipped. With batch_translate, non-English transcripts are
+        translated together as text in the background instead of uploading each clip's audio.
+        """
+        translate = not batch_translate
         os.environ['GRPC_POLL_STRATEGY'] = 'poll'
+        self.transcribe_from_master = from_master
+        self.use_vad = vad
+        self.single_language = single_language
+
+        def get_transcript(clip):
+            if not self.transcribe_from_master:
+                return None
+            try:
+                return self._master_transcript_for(clip)
+            except Exception as e:
+                # Fall back to transcribing clips one by one
+                self.transcribe_from_master = False
+                if self.error_handler:
+                    self.error_handler.warning(f"WARNING: Could not transcribe the main video, transcribing clips separately. ({e})")
+                return None
 
         if multi:
             def transcribe_and_handle_errors(clip):
                 try:
-                    clip.transcribe_clip()
+                    clip.transcribe_clip(get_transcript(clip), vad=self.use_vad, translate=translate, single_language=self.single_language)
                     return True, None, clip
                 except Exception as e:
                     return False, traceback.format_exc(), clip
             
-            with ThreadPoolExecutor(max_workers=3) as executor:
+            # Requests are throttled by the shared Deepgram limiter, the pool just has to be big enough for it
+            with ThreadPoolExecutor(max_workers=get_limiter("deepgram").max_concurrency) as executor:
                 futures = [executor.submit(transcribe_and_handle_errors, clip) for clip in self.clips]
 
                 results = []
@@ -327,60 +592,135 @@ class ClipManager:
                     else:
                         if self.error_handler:
                             if clip.whisper_results.no_speech_prob < 0.3:
-                                self.error_handler.stream_status(clip.whisper_results.english_text, f"Identified Speech ({clip.id})", clip.file_path)
+                                self.error_handler.stream_status(clip.whisper_results.english_text or clip.whisper_results.text, f"Identified Speech ({clip.id})", clip.existing_file_path)
 
                 successful_transcriptions = sum(results)
                 failed_transcriptions = len(self.clips) - successful_transcriptions
                 
                 if self.error_handler:
                     self.error_handler.stream_status(f"Transcription complete. Successful: {successful_transcriptions}, Failed: {failed_transcriptions}")
+                    self.error_handler.info(transcription_cache.stats())
         else:
             for clip in self.clips:
                 try:
-                    clip.transcribe_clip()
+                    clip.transcribe_clip(get_transcript(clip), vad=self.use_vad, translate=translate, single_language=self.single_language)
                 except Exception as e:
                     if self.error_handler:
                         self.error_handler.error(f"ERROR: {traceback.format_exc()}")
 
+        if batch_translate:
+            # Runs while the next stages start, match_clips waits for it before using the English text
+            self.start_translations()
+
+    def start_translations(self):
+        """Translates the clips waiting for English text on a background thread."""
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.translations = executor.submit(self.translate_clips)
+        executor.shutdown(wait=False)
+
+    def wait_for_translations(self):
+        """Waits for background translations started by transcribe_clips."""
+        if self.translations is None:
+            return
+        translations, self.translations = self.translations, None
+        try:
+            num_batch, num_audio, batch_error = translations.result()
+            if self.error_handler and batch_error:
+                self.error_handler.warning(f"WARNING: Batch translation failed, translated from audio: {batch_error}")
+            if self.error_handler and (num_batch or num_audio):
+                self.error_handler.info(f"Translated {num_batch} clips in one batch, {num_audio} from their audio")
+        except Exception as e:
+            if self.error_handler:
+                self.error_handler.error(f"ERROR: {traceback.format_exc()}")
+            # Untranslated clips fall back to their original text
+            for clip in self.clips:
+                if clip.whisper_results is not None and clip.whisper_results.needs_translation:
+                    clip.whisper_results.english_text = clip.whisper_results.text
+
+    def translate_clips(self):
+        """Translates the transcripts of all non-English clips in a single LLM request.
+
+        Clips the batch doesn't cover are translated from their audio as before.
+        Returns the number of clips translated each way and the batch's error, if it failed;
+        it runs in the background, so wait_for_translations reports them.
+        """
+        clips = [clip for clip in self.clips if clip.whisper_results is not None and clip.whisper_results.needs_translation]
+        if not clips:
+            return 0, 0, None
+
+        translations = {}
+        batch_error = None
+        try:
+            transcripts = "\n".join(f'<clip id="{clip.id}">\n{clip.whisper_results.text}\n</clip>' for clip in clips)
+            response = run_chain_json(translate_transcripts_chain, {"TRANSCRIPTS": transcripts})
+            translations = {normalize_clip_id(translation["clip_id"]): translation["english_text"] for translation in response["translations"]}
+        except Exception:
+            batch_error = traceback.format_exc()
+
+        remaining = []
+        for clip in clips:
+            translation = translations.get(normalize_clip_id(clip.id))
+            if translation:
+                clip.whisper_results.english_text = translation
+            else:
+                remaining.append(clip)
+        with ThreadPoolExecutor(max_workers=get_limiter("openai").max_concurrency) as executor:
+            list(executor.map(Clip.translate_audio, remaining))
+        return len(clips) - len(remaining), len(remaining), batch_error
+
     def break_up_clips(self, max_duration=8.0):
+        """Splits long B-roll clips into equal parts.
+
+        Parts are ranges of the clip's source, so splitting doesn't read or write any video.
+        When extracted, they're written to the parts folder, so a later load_clips doesn't
+        pick them up next to the clip they came from.
+        """
         num_clips_before = len(self.clips)
-        for clip in self.clips:
+        parts_folder = self.clips_folder / PARTS_FOLDER
+        for clip in list(self.clips):
             if clip.has_quote:
                 continue
             if clip.duration > max_duration:
                 num_clips = int(clip.duration / max_duration) + 1
                 clip_duration = clip.duration / num_clips
-                clip_file = clip.file_path
-                clip_file_name = clip_file.stem
+                clip_file_name = clip.sidecar_file("").name
+                source_range = clip.source_range
+                parts_folder.mkdir(parents=True, exist_ok=True)
                 for i in range(num_clips):
                     start = i * clip_duration
                     end = (i + 1) * clip_duration
                     if end > clip.duration:
                         end = clip.duration
-                    new_clip_file = self.clips_folder / f"{clip_file_name}_{i}.mp4"
-                    video_clip = mp.VideoFileClip(str(clip_file)).subclip(start, end)
-                    if not new_clip_file.exists():
-                        video_clip.write_videofile(str(new_clip_file), logger=None)
 
                     new_clip = copy.deepcopy(clip)
-                    new_clip.file_path = new_clip_file
-                    new_clip.duration = video_clip.duration
+                    new_clip._file_path = parts_folder / f"{clip_file_name}_{i}.mp4"
+                    new_clip.clip_range = source_range.sub_range(start, end)
+                    new_clip.duration = new_clip.clip_range.duration
                     new_clip.id = f"{clip.id}_{i}"
                     self.clips.append(new_clip)
 
                     if self.error_handler:
-                        self.error_handler.stream_status(f"Split clip {clip.id} into {new_clip.id}", video=new_clip_file)
+                        self.error_handler.stream_status(f"Split clip {clip.id} into {new_clip.id}")
                 self.clips.remove(clip)
-                clip_file.unlink()
+                if clip.clip_range is not None:
+                    # Only an extracted copy of the master, the parts read the master directly
+                    clip._file_path.unlink(missing_ok=True)
         num_clips_after = len(self.clips)
 
         if self.error_handler:
             self.error_handler.info(f"Split {num_clips_before} clips into {num_clips_after} clips")
     
     def courtesy_clips(self, body: str):
-        courtesies_json = run_chain_json(courtesy_chain, {"BODY": body})
+        self.apply_courtesies(self.get_courtesies(body))
+
+    def get_courtesies(self, body: str) -> Dict:
+        """Extracts courtesy requirements per shot from the story body, which doesn't need the clips."""
+        self.artifacts.set_input("body", body)
+        courtesies_json = self.artifacts.get("courtesies")
         print(courtesies_json)
+        return courtesies_json
 
+    def apply_courtesies(self, courtesies_json: Dict):
         for clip in self.clips:
             if clip.shot_id is None:
                 continue
@@ -434,6 +774,19 @@ ID {clip.id}: {clip.whisper_results.english_text}
         from src.gemini import describe_clips
         return describe_clips(clips, shotlist, previous_shot_id, next_shot_id)
 
+    def get_reader(self, file_path: Path) -> mp.VideoFileClip:
+        """Returns the pooled clip for a file, shared by all placements during a render."""
+        return self.reader_pool.get(file_path)
+
+    def get_clip_video(self, clip: Clip) -> mp.VideoFileClip:
+        """Returns a clip's window of its pooled source video, without extracting the clip."""
+        source = clip.source_range
+        return self.reader_pool.subclip(source.source_file, source.start, source.end)
+
+    def close_readers(self):
+        """Closes all pooled readers, called when a render finishes."""
+        self.reader_pool.close()
+
     def get_clip(self, clip_id):
         for clip in self.clips:
             if clip.id == clip_id:
@@ -0,0 +1,185 @@
+# ClipRanges
+
+# STREAMLIT
+from src.ffmpeg import get_ffprobe_binary, run_ffmpeg
+from src.probe import probe_media
+# /STREAMLIT
+
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import subprocess
+import threading
+import bisect
+import json
+
+@dataclass
+class ClipRange:
+    """A time window (in seconds) of a source video that stands in for a clip file."""
+
+    source_file: Path
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def sub_range(self, start: float, end: float) -> "ClipRange":
+        """Returns a window of this range, with start/end relative to the range."""
+        return ClipRange(self.source_file, self.start + start, min(self.start + end, self.end))
+
+    def to_dict(self) -> Dict:
+        return {"source_file": str(self.source_file), "start": self.start, "end": self.end}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ClipRange":
+        return cls(Path(data["source_file"]), data["start"], data["end"])
+
+def keyframe_times(video_file: Path) -> List[float]:
+    """Returns the sorted presentation times of a video's keyframes, read from packet flags without decoding."""
+    stat = Path(video_file).stat()
+    return list(_keyframe_times(str(Path(video_file).resolve()), stat.st_mtime_ns, stat.st_size))
+
+@lru_cache(maxsize=32)
+def _keyframe_times(video_file: str, mtime_ns: int, size: int) -> Tuple[float, ...]:
+    command = [get_ffprobe_binary(), "-v", "error", "-select_streams", "v:0",
+               "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", video_file]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on {video_file}: {result.stderr}")
+    times = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            times.append(float(pts_time))
+    return tuple(sorted(times))
+
+# Matches the settings split_video_ffmpeg used, for ranges that have to be re-encoded
+ENCODE_OPTIONS = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "22", "-pix_fmt", "yuv420p"]
+AUDIO_OPTIONS = ["-c:a", "aac", "-b:a", "192k"]
+
+# Stream parameters (mostly from the SPS) an encoded head must share with the copied tail to be joined
+SPLICE_PARAMETERS = ("codec_name", "profile", "level", "pix_fmt", "field_order", "width", "height",
+                     "sample_aspect_ratio", "color_range", "color_space", "color_transfer", "color_primaries")
+# ffprobe's H.264 profile names as x264 options
+X264_PROFILES = {"Constrained Baseline": "baseline", "Baseline": "baseline", "Main": "main", "High": "high",
+                 "High 10": "high10", "High 4:2:2": "high422", "High 4:4:4 Predictive": "high444"}
+
+def video_stream_parameters(video_file: Path) -> Dict[str, Optional[str]]:
+    """Returns the SPLICE_PARAMETERS of a file's first video stream."""
+    command = [get_ffprobe_binary(), "-v", "error", "-select_streams", "v:0",
+               "-show_entries", f"stream={','.join(SPLICE_PARAMETERS)}", "-of", "json", str(video_file)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on {video_file}: {result.stderr}")
+    streams = json.loads(result.stdout).get("streams") or [{}]
+    return {name: streams[0].get(name) for name in SPLICE_PARAMETERS}
+
+def head_encode_options(source: Dict[str, Optional[str]]) -> List[str]:
+    """Encoding options for a smart render head, matching the source's profile, level, pixel format and colors."""
+    options = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "22", "-pix_fmt", source.get("pix_fmt") or "yuv420p"]
+    if source.get("profile") in X264_PROFILES:
+        options += ["-profile:v", X264_PROFILES[source["profile"]]]
+    if source.get("level"):
+        options += ["-level", str(source["level"])]
+    for parameter, option in (("color_range", "-color_range"), ("color_space", "-colorspace"),
+                              ("color_transfer", "-color_trc"), ("color_primaries", "-color_primaries")):
+        if source.get(parameter) not in (None, "unknown"):
+            options += [option, source[parameter]]
+    return options
+
+def extract_range(clip_range: ClipRange, output_file: Path, smart_render: bool = True, error_handler = None):
+    """Writes a clip range to its own file with as little re-encoding as possible.
+
+    - A range starting on a keyframe is stream copied.
+    - Otherwise, with smart_render, only the frames up to the next keyframe are encoded and
+      the rest of the video is stream copied. Audio is re-encoded, which is cheap.
+    - Ranges with no keyframe inside them, non H.264 sources, and sources whose stream parameters
+      an encoded head can't match are encoded fully, reported as a warning to error_handler.
+    """
+    source_file = clip_range.source_file
+    info = probe_media(source_file)
+    tolerance = 0.5 / (info.fps or 30)
+    keyframes = keyframe_times(source_file)
+    start, end = clip_range.start, clip_range.end
+
+    next_keyframe_idx = bisect.bisect_left(keyframes, start - tolerance)
+    next_keyframe = keyframes[next_keyframe_idx] if next_keyframe_idx < len(keyframes) else None
+
+    if next_keyframe is not None and abs(next_keyframe - start) <= tolerance:
+        run_ffmpeg(["-ss", f"{start:.6f}", "-i", source_file, "-t", f"{clip_range.duration:.6f}",
+                    "-map", "0:v:0", "-map", "0:a?", "-c", "copy", "-avoid_negative_ts", "make_zero",
+                    "-movflags", "+faststart", output_file])
+        return
+    if smart_render and info.video_codec == "h264" and next_keyframe is not None and next_keyframe < end - tolerance:
+        mismatch = _smart_render(clip_range, next_keyframe, output_file)
+        if mismatch is None:
+            return
+        message = f"WARNING: Re-encoding {output_file.name} fully, its smart render head and tail differ: {mismatch}"
+        if error_handler:
+            error_handler.warning(message)
+        else:
+            print(message)
+    run_ffmpeg(["-ss", f"{start:.6f}", "-i", source_file, "-t", f"{clip_range.duration:.6f}",
+                "-map", "0:v:0", "-map", "0:a?", *ENCODE_OPTIONS, *AUDIO_OPTIONS,
+                "-movflags", "+faststart", output_file])
+
+def _smart_render(clip_range: ClipRange, keyframe: float, output_file: Path) -> Optional[Dict]:
+    """Encodes the head of a range up to its first keyframe and stream copies the remaining GOPs.
+
+    When the encoded head doesn't match the source's stream parameters (e.g. an interlaced or
+    4:2:2 source), the joined file would decode with corruption on some players. Nothing is
+    written then, and the mismatching parameters are returned as {name: (head, tail)}.
+    """
+    source_file = clip_range.source_file
+    head_file = output_file.with_name(f"{output_file.stem}_head.ts")
+    tail_file = output_file.with_name(f"{output_file.stem}_tail.ts")
+    concat_file = output_file.with_name(f"{output_file.stem}_concat.txt")
+    try:
+        # Annex B streams carry their parameter sets in band, so the encoded head and copied tail can be joined
+        source_parameters = video_stream_parameters(source_file)
+        run_ffmpeg(["-ss", f"{clip_range.start:.6f}", "-i", source_file, "-t", f"{keyframe - clip_range.start:.6f}",
+                    "-map", "0:v:0", "-an", *head_encode_options(source_parameters), "-bsf:v", "h264_mp4toannexb", "-f", "mpegts", head_file])
+        run_ffmpeg(["-ss", f"{keyframe:.6f}", "-i", source_file, "-t", f"{clip_range.end - keyframe:.6f}",
+                    "-map", "0:v:0", "-an", "-c:v", "copy", "-bsf:v", "h264_mp4toannexb", "-f", "mpegts", tail_file])
+        head_parameters, tail_parameters = video_stream_parameters(head_file), video_stream_parameters(tail_file)
+        if head_parameters != tail_parameters:
+            return {name: (head_parameters[name], tail_parameters[name]) for name in SPLICE_PARAMETERS if head_parameters[name] != tail_parameters[name]}
+        with open(concat_file, "w") as f:
+            f.write(f"file '{head_file.resolve()}'\nfile '{tail_file.resolve()}'\n")
+        run_ffmpeg(["-f", "concat", "-safe", "0", "-i", concat_file,
+                    "-ss", f"{clip_range.start:.6f}", "-t", f"{clip_range.duration:.6f}", "-i", source_file,
+                    "-map", "0:v:0", "-map", "1:a?", "-c:v", "copy", *AUDIO_OPTIONS,
+                    "-movflags", "+faststart", output_file])
+        return None
+    finally:
+        for file in (head_file, tail_file, concat_file):
+            file.unlink(missing_ok=True)
+
+_materialize_locks: Dict[Path, threading.Lock] = {}
+_materialize_locks_lock = threading.Lock()
+
+def materialize(clip_range: ClipRange, output_file: Path, error_handler = None) -> Path:
+    """Extracts a clip range to output_file once, safe to call from several threads."""
+    with _materialize_locks_lock:
+        lock = _materialize_locks.setdefault(Path(output_file).resolve(), threading.Lock())
+    with lock:
+        if not output_file.exists():
+            tmp_file = output_file.with_name(f"{output_file.stem}_tmp{output_file.suffix}")
+            extract_range(clip_range, tmp_file, error_handler=error_handler)
+            tmp_file.replace(output_file)
+    return output_file
+
+def extract_audio(clip_range: ClipRange, output_file: Path) -> Path:
+    """Writes just the audio of a clip range, without touching the video stream."""
+    run_ffmpeg(["-ss", f"{clip_range.start:.6f}", "-i", clip_range.source_file, "-t", f"{clip_range.duration:.6f}",
+                "-vn", "-c:a", "libmp3lame", "-q:a", "2", output_file])
+    return output_file
+
+def extract_frame(clip_range: ClipRange, time: float, output_file: Path) -> Path:
+    """Saves the frame at time (relative to the range) as an image, decoding from the nearest keyframe only."""
+    if not output_file.exists():
+        run_ffmpeg(["-ss", f"{clip_range.start + time:.6f}", "-i", clip_range.source_file, "-frames:v", "1", output_file])
+    return output_file
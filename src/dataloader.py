@@ -3,12 +3,13 @@
 # STREAMLIT
 from src.reuters import get_item, get_assets, download_asset, get_oauth_token
 from src.prompts import extract_storyline_and_shotlist_chain, run_chain
+from src.download import download_file
 # /STREAMLIT
 
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
-import requests
 
 import html
 
@@ -81,6 +82,8 @@ class ReutersAPIDataLoader(DataLoader):
         self.storyline: Optional[str] = None
         self.language: Optional[str] = None
         self.location: Optional[str] = None
+        self.video_download: Optional[Future] = None
+        self.video_file_path: Optional[Path] = None
     
     def pull_reuters_api(self) -> None:
         if self.pulled_reuters_api:
@@ -88,6 +91,9 @@ class ReutersAPIDataLoader(DataLoader):
 
         raw_html, headline, language, located = get_item(self.reuters_id)
 
+        # The video downloads in the background while the text is parsed (and possibly extracted by the LLM)
+        self.video_download = self._start_video_download()
+
         parsed_html = html.unescape(raw_html).replace("<p/>", "")
         bodyhtml = extract_str_between(parsed_html, "<body>", "</body>")
         shotlist = extract_str_between(bodyhtml, "</p><p>1.", "</p><p>STORY:")[7:-13]
@@ -117,16 +123,18 @@ class ReutersAPIDataLoader(DataLoader):
         self.location = located
         self.body = body
 
+        self.pulled_reuters_api = True
+
+    def _start_video_download(self) -> Future:
+        """Streams the video rendition to disk on a background thread."""
         video_asset = get_assets(self.reuters_id)[0]
         video_url, asset_type = download_asset(self.reuters_id, video_asset["uri"])
-        res = requests.get(video_url)
         video_file_path = self.storage_path / "video.mp4"
-        with open(video_file_path, "wb") as file:
-            file.write(res.content)
-        
-        self.video_file_path = video_file_path
 
-        self.pulled_reuters_api = True
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(download_file, video_url, video_file_path, video_asset.get("sizeInBytes"))
+        executor.shutdown(wait=False)
+        return future
         
     def load_storyline(self) -> str:
         self.pull_reuters_api()
@@ -141,7 +149,10 @@ class ReutersAPIDataLoader(DataLoader):
         return self.story_title
 
     def get_video_file_path(self) -> Path:
+        """Returns the video file, waiting for its download to finish."""
         self.pull_reuters_api()
+        if self.video_file_path is None:
+            self.video_file_path = self.video_download.result()
         return self.video_file_path
     
     def get_body(self) -> str:
@@ -0,0 +1,73 @@
+# Download
+
+from pathlib import Path
+from typing import Callable, Optional
+import time
+
+import requests
+
+CHUNK_SIZE = 1024 * 1024 # 1 MiB per write, memory use doesn't depend on the file size
+RETRY_DELAYS = [1, 5, 15, 30, 60]
+
+def download_file(url: str, file_path: Path, expected_size: Optional[int] = None,
+                  on_progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Path:
+    """Streams url to file_path in chunks, resuming from a partial download with HTTP Range requests.
+
+    Data is written to a .part file that is moved into place once its size matches
+    expected_size (when given), so a complete file_path is never a truncated download.
+    """
+    file_path = Path(file_path)
+    expected_size = int(expected_size) if expected_size else None
+    if file_path.exists() and (expected_size is None or file_path.stat().st_size == expected_size):
+        return file_path
+
+    part_file = file_path.with_name(file_path.name + ".part")
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    for attempt, delay in enumerate([0] + RETRY_DELAYS):
+        time.sleep(delay)
+        try:
+            _download_to_part_file(url, part_file, expected_size, on_progress)
+            break
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            print(f"Download of {file_path.name} interrupted ({e}), resuming (attempt {attempt + 1})")
+    else:
+        raise IOError(f"Download of {url} failed after {len(RETRY_DELAYS) + 1} attempts")
+
+    downloaded_size = part_file.stat().st_size
+    if expected_size is not None and downloaded_size != expected_size:
+        part_file.unlink()
+        raise IOError(f"Downloaded {downloaded_size} bytes for {file_path.name}, expected {expected_size}")
+    part_file.replace(file_path)
+    return file_path
+
+def _download_to_part_file(url: str, part_file: Path, expected_size: Optional[int],
+                           on_progress: Optional[Callable[[int, Optional[int]], None]]):
+    """Appends the rest of url to part_file, restarting if the server ignores the Range request."""
+    downloaded = part_file.stat().st_size if part_file.exists() else 0
+    if expected_size is not None and downloaded == expected_size:
+        return
+    if expected_size is not None and downloaded > expected_size:
+        part_file.unlink()
+        downloaded = 0
+
+    headers = {"Range": f"bytes={downloaded}-"} if downloaded else {}
+    with requests.get(url, headers=headers, stream=True, timeout=(10, 60)) as response:
+        if response.status_code == 416:
+            # Nothing left to fetch, the size check decides whether the file is complete
+            return
+        response.raise_for_status()
+        if downloaded and response.status_code != 206:
+            downloaded = 0
+        mode = "ab" if downloaded else "wb"
+
+        total = expected_size
+        if total is None and "Content-Length" in response.headers:
+            total = downloaded + int(response.headers["Content-Length"])
+
+        with open(part_file, mode) as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                downloaded += len(chunk)
+                if on_progress:
+                    on_progress(downloaded, total)
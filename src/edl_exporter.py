@@ -65,7 +65,7 @@ class EDLExporter:
 
     def _generate_sot_edl_entry(self, section: SOTScriptSection, start_time: float) -> Dict:
         """Generates an EDL entry for a SOTScriptSection."""
-        clip_duration = section.clip.load_video().duration
+        clip_duration = section.clip.duration
 
         if section.language == Language.from_str("English") or section.dub_audio_file is None:
             end_time = min(section.end, start_time + clip_duration)
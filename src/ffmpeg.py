@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 import tarfile
+import subprocess
 
 # Function to download and extract FFmpeg
 def download_ffmpeg():
@@ -17,6 +18,29 @@ def download_ffmpeg():
 
     # Set the FFmpeg binary path
     os.chmod(ffmpeg_bin, 0o755)
+    ffprobe_bin = os.path.join(os.path.dirname(ffmpeg_bin), "ffprobe")
+    if Path(ffprobe_bin).exists():
+        os.chmod(ffprobe_bin, 0o755)
 
     # Set the FFMPEG_BINARY environment variable
-    os.environ['FFMPEG_BINARY'] = ffmpeg_bin
\ No newline at end of file
+    os.environ['FFMPEG_BINARY'] = ffmpeg_bin
+
+def get_ffmpeg_binary() -> str:
+    """Returns the FFmpeg binary, preferring the one set up by download_ffmpeg."""
+    return os.environ.get("FFMPEG_BINARY", "ffmpeg")
+
+def get_ffprobe_binary() -> str:
+    """Returns the ffprobe binary, preferring the one shipped next to the FFmpeg binary."""
+    if "FFPROBE_BINARY" in os.environ:
+        return os.environ["FFPROBE_BINARY"]
+    ffprobe_bin = Path(get_ffmpeg_binary()).with_name("ffprobe")
+    if ffprobe_bin.parent != Path(".") and ffprobe_bin.exists():
+        return str(ffprobe_bin)
+    return "ffprobe"
+
+def run_ffmpeg(args: list) -> None:
+    """Runs FFmpeg with the given arguments, raising with its stderr on failure."""
+    command = [get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error", *[str(arg) for arg in args]]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed with code {result.returncode}: {result.stderr}")
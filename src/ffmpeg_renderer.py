@@ -0,0 +1,463 @@
+# FFmpegRenderer
+
+# STREAMLIT
+from src.news_script import AnchorScriptSection, SOTScriptSection, is_type
+from src.movie_utils import loudness_gain_db, load_still_image
+from src.loudness import measure_loudness_file
+from src.ffmpeg import run_ffmpeg
+from src.hashing import cached_sha256sum
+import streamlit as st
+# /STREAMLIT
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import traceback
+import threading
+import hashlib
+import io
+import os
+
+import moviepy.editor as mp
+
+class FilterGraph:
+    """Builds an FFmpeg command with a single filter_complex."""
+
+    def __init__(self):
+        self.inputs: List[List[str]] = []
+        self.filters: List[str] = []
+        self.label_count = 0
+
+    def add_input(self, file: Path, start: Optional[float] = None, duration: Optional[float] = None, loop: bool = False, input_format: Optional[str] = None, still_fps: Optional[float] = None) -> int:
+        """Adds an input file and returns its index. start/duration seek on the input side.
+
+        still_fps loops a single image as a video stream at that frame rate.
+        """
+        options = []
+        if input_format == "concat":
+            options += ["-f", "concat", "-safe", "0"]
+        if still_fps:
+            options += ["-loop", "1", "-framerate", str(still_fps)]
+        if loop:
+            options += ["-stream_loop", "-1"]
+        if start:
+            options += ["-ss", f"{start:.3f}"]
+        if duration is not None:
+            options += ["-t", f"{duration:.3f}"]
+        self.inputs.append(options + ["-i", str(file)])
+        return len(self.inputs) - 1
+
+    def add_image_input(self, file: Path) -> str:
+        """Adds a single frame image input, returns its video stream label."""
+        return f"{self.add_input(file)}:v"
+
+    def label(self, prefix: str = "s") -> str:
+        self.label_count += 1
+        return f"{prefix}{self.label_count}"
+
+    def add(self, inputs: List[str], filter_str: str, num_outputs: int = 1, prefix: str = "s"):
+        """Adds a filter chain, returns the output label (or a list if num_outputs > 1)."""
+        outputs = [self.label(prefix) for _ in range(num_outputs)]
+        self.filters.append("".join(f"[{label}]" for label in inputs) + filter_str + "".join(f"[{label}]" for label in outputs))
+        return outputs[0] if num_outputs == 1 else outputs
+
+    def build(self) -> str:
+        return ";".join(self.filters)
+
+    def command(self, output_file: Path, maps: List[str], output_options: List[str]) -> List[str]:
+        args = []
+        for input_args in self.inputs:
+            args += input_args
+        args += ["-filter_complex", self.build()]
+        for label in maps:
+            args += ["-map", label if ":" in label else f"[{label}]"]
+        return args + output_options + [str(output_file)]
+
+class FFmpegRenderer:
+    """Compiles the VideoEditor's section/broll/byline/logline decisions into a single FFmpeg filter graph."""
+
+    def __init__(self, video_editor, work_folder: Path):
+        self.video_editor = video_editor
+        self.news_script = video_editor.news_script
+        self.clip_manager = video_editor.clip_manager
+        self.error_handler = video_editor.error_handler
+        self.output_resolution = video_editor.output_resolution
+        self.fps = video_editor.fps
+        self.work_folder = work_folder
+        self.work_folder.mkdir(parents=True, exist_ok=True)
+        self.overlay_files: Dict[int, Tuple[object, Path]] = {}
+        self.still_files: Dict[Path, Path] = {}
+
+    def render(self, output_file: Path):
+        """Renders the full video with one FFmpeg process."""
+        graph = FilterGraph()
+        segments: List[Tuple[str, str]] = []
+        total_duration = 0.0
+
+        # STREAMLIT
+        progress_bar = st.progress(0.0)
+        for i, section in enumerate(self.news_script.sections):
+            try:
+                segment = self.compile_section(graph, section)
+                if segment is not None:
+                    video_label, audio_label, duration = segment
+                    segments.append((video_label, audio_label))
+                    total_duration += duration
+            except Exception as e:
+                if self.error_handler:
+                    self.error_handler.warning(f"Error when compiling section {section.id}: {traceback.format_exc()}")
+            progress_bar.progress((i+1) / len(self.news_script.sections))
+        # /STREAMLIT
+
+        if not segments:
+            raise ValueError("No sections could be compiled into the video")
+
+        video_label, audio_label = graph.add([label for segment in segments for label in segment], f"concat=n={len(segments)}:v=1:a=1", num_outputs=2)
+        video_label, audio_label = self.compile_finish(graph, video_label, audio_label, total_duration, fade_in=True, fade_out=True)
+
+        if self.error_handler:
+            self.error_handler.info("Rendering final video with FFmpeg")
+        run_ffmpeg(graph.command(output_file, [video_label, audio_label], self.encode_options()))
+
+    def render_sections(self, output_file: Path, max_workers: Optional[int] = None):
+        """Renders each section to its own file in parallel, then joins them without re-encoding.
+
+        The logline and fades are burned into the segments, so only the background music
+        needs a final (audio only) pass.
+        """
+        segments_folder = self.work_folder / "segments"
+        segments_folder.mkdir(parents=True, exist_ok=True)
+
+        compiled = []
+        for section in self.news_script.sections:
+            try:
+                graph = FilterGraph()
+                segment = self.compile_section(graph, section)
+                if segment is not None:
+                    compiled.append((section, graph, *segment))
+            except Exception as e:
+                if self.error_handler:
+                    self.error_handler.warning(f"Error when compiling section {section.id}: {traceback.format_exc()}")
+
+        if not compiled:
+            raise ValueError("No sections could be compiled into the video")
+
+        cpu_count = os.cpu_count() or 1
+        max_workers = max_workers or min(len(compiled), cpu_count)
+        threads_per_segment = max(1, cpu_count // max_workers)
+
+        segment_files = []
+        commands = []
+        total_duration = 0.0
+        for i, (section, graph, video_label, audio_label, duration) in enumerate(compiled):
+            video_label, audio_label = self.compile_finish(graph, video_label, audio_label, duration,
+                                                           fade_in=i == 0, fade_out=i == len(compiled) - 1, music=False)
+            command = graph.command(Path("segment.mp4"), [video_label, audio_label], self.encode_options(threads=threads_per_segment))
+            segment_file = segments_folder / f"{self.segment_key(command)}.mp4"
+            segment_files.append(segment_file)
+            total_duration += duration
+            if segment_file.exists():
+                continue
+            tmp_file = segment_file.with_name(f"{segment_file.stem}_tmp.mp4")
+            commands.append((section, command[:-1] + [str(tmp_file)], tmp_file, segment_file))
+
+        if self.error_handler:
+            self.error_handler.info(f"Rendering {len(commands)} of {len(segment_files)} sections with FFmpeg ({max_workers} in parallel), reusing {len(segment_files) - len(commands)} cached sections")
+
+        def render_segment(command: List[str], tmp_file: Path, segment_file: Path):
+            run_ffmpeg(command)
+            tmp_file.rename(segment_file)
+
+        # Each worker only waits on its own FFmpeg process, so threads are enough to keep every core busy
+        # STREAMLIT
+        progress_bar = st.progress(0.0)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(render_segment, command, tmp_file, segment_file): section for section, command, tmp_file, segment_file in commands}
+            for i, future in enumerate(as_completed(futures)):
+                future.result()
+                progress_bar.progress((i+1) / len(futures))
+        progress_bar.progress(1.0)
+        # /STREAMLIT
+
+        self.concat_segments(segment_files, output_file, total_duration)
+
+    def segment_key(self, command: List[str]) -> str:
+        """Hashes a segment's FFmpeg command with every input file replaced by its content digest.
+
+        The command captures the trims, speed changes, loudness gains, graphics and encoding
+        settings, so a changed section gets a new key while unchanged sections keep theirs.
+        """
+        hasher = hashlib.sha256()
+        previous_arg = None
+        for arg in command[:-1]: # skip the output file
+            if previous_arg == "-threads":
+                arg = ""
+            elif previous_arg == "-i":
+                arg = self.file_digest(Path(arg))
+            hasher.update(arg.encode())
+            hasher.update(b"\0")
+            previous_arg = arg
+        return hasher.hexdigest()
+
+    def file_digest(self, file: Path) -> str:
+        # Clips share the master file, so digests are memoized for the whole process
+        return cached_sha256sum(file)
+
+    def concat_segments(self, segment_files: List[Path], output_file: Path, duration: float):
+        """Joins identically encoded segments with the concat demuxer, mixing in music if enabled."""
+        concat_file = output_file.parent / f"{output_file.stem}_segments.txt"
+        with open(concat_file, "w") as f:
+            for segment_file in segment_files:
+                f.write(f"file '{segment_file.resolve()}'\n")
+
+        graph = FilterGraph()
+        input_idx = graph.add_input(concat_file, input_format="concat")
+        if self.video_editor.music:
+            audio_label = self.compile_music(graph, f"{input_idx}:a", duration)
+            audio_options = ["-c:a", "aac", "-ar", "44100"]
+            if self.video_editor.render_profile.audio_bitrate:
+                audio_options += ["-b:a", self.video_editor.render_profile.audio_bitrate]
+            run_ffmpeg(graph.command(output_file, [f"{input_idx}:v", audio_label],
+                                     ["-c:v", "copy", *audio_options, "-movflags", "+faststart"]))
+        else:
+            args = []
+            for input_args in graph.inputs:
+                args += input_args
+            run_ffmpeg(args + ["-c", "copy", "-movflags", "+faststart", str(output_file)])
+        concat_file.unlink()
+
+    def compile_finish(self, graph: FilterGraph, video_label: str, audio_label: str, duration: float, fade_in: bool, fade_out: bool, music: bool = True) -> Tuple[str, str]:
+        """Applies the story level logline, background music and fades."""
+        if self.video_editor.add_logline:
+            video_label = self.compile_overlay(graph, video_label, self.video_editor._create_logline_overlay(self.news_script.headline, self.output_resolution))
+        if music and self.video_editor.music:
+            audio_label = self.compile_music(graph, audio_label, duration)
+        fade_duration = (1.0/self.fps)*10
+        fades = []
+        if fade_in:
+            fades.append(f"fade=t=in:st=0:d={fade_duration:.4f}")
+        if fade_out:
+            fades.append(f"fade=t=out:st={max(duration - fade_duration, 0):.4f}:d={fade_duration:.4f}")
+        if fades:
+            video_label = graph.add([video_label], ",".join(fades))
+        return video_label, audio_label
+
+    def compile_section(self, graph: FilterGraph, section) -> Optional[Tuple[str, str, float]]:
+        """Compiles a script section, returns its video label, audio label and duration."""
+        if is_type(section, SOTScriptSection):
+            if section.clip is not None:
+                return self.compile_sot_section(graph, section)
+        elif is_type(section, AnchorScriptSection):
+            if section.text:
+                return self.compile_anchor_section(graph, section)
+        else:
+            print(f"ERROR: Unknown section type: {type(section)}")
+        return None
+
+    def compile_sot_section(self, graph: FilterGraph, section: SOTScriptSection) -> Tuple[str, str, float]:
+        """Mirrors VideoEditor._process_sot_section."""
+        editor = self.video_editor
+        # Clips can be ranges of the master video, only their window is read
+        source = section.clip.source_range
+        clip_file = source.source_file
+        clip_duration = section.clip.duration
+        gain = loudness_gain_db(measure_loudness_file(clip_file, source.start, source.end), -23)
+
+        if section.dub_audio_file is None:
+            duration = min(section.end, clip_duration) - section.start
+            input_idx = graph.add_input(clip_file, start=source.start + section.start, duration=duration)
+            video_label = self.compile_video_source(graph, input_idx)
+            audio_label = graph.add([f"{input_idx}:a"], f"{self.audio_format()},volume={gain:.3f}dB")
+        else:
+            duration = clip_duration - section.start
+            dub_audio = mp.AudioFileClip(str(section.dub_audio_file))
+            dub_gain = loudness_gain_db(measure_loudness_file(section.dub_audio_file), -23)
+
+            # 1. Calculate the time the dub starts
+            dub_start_time = editor.lower_volume_duration + editor.dub_delay
+            dub_end_time = dub_audio.duration + dub_start_time
+
+            input_idx = graph.add_input(clip_file, start=source.start + section.start, duration=duration)
+            video_label = self.compile_video_source(graph, input_idx)
+
+            if dub_start_time > duration:
+                audio_label = graph.add([f"{input_idx}:a"], f"{self.audio_format()},volume={gain:.3f}dB")
+                return video_label, audio_label, duration
+
+            # 2. Original audio with fadeout and lower volume
+            rest_loudness = measure_loudness_file(clip_file, source.start + section.start + editor.lower_volume_duration, source.end)
+            rest_gain = gain + loudness_gain_db(rest_loudness + gain, editor.dub_volume_lufs, cap=True)
+            rest_factor = 10 ** ((rest_gain - gain) / 20)
+            original_audio_label = graph.add([f"{input_idx}:a"], f"{self.audio_format()},volume={gain:.3f}dB,"
+                                                                  f"volume=volume='if(lt(t,{editor.lower_volume_duration:.4f}),1-t/{editor.lower_volume_duration*1.1:.4f},{rest_factor:.6f})':eval=frame")
+
+            # 3. Delayed dubbed audio
+            delay_ms = int(dub_start_time * 1000)
+            dub_idx = graph.add_input(section.dub_audio_file)
+            dub_audio_label = graph.add([f"{dub_idx}:a"], f"{self.audio_format()},volume={dub_gain:.3f}dB,adelay={delay_ms}|{delay_ms}")
+
+            # 4. Combine original and dubbed audio
+            audio_label = graph.add([original_audio_label, dub_audio_label], f"amix=inputs=2:duration=longest:normalize=0,atrim=duration={dub_end_time:.4f}")
+
+            # 5. Adjust video speed if needed
+            if duration > dub_end_time:
+                video_label = graph.add([video_label], f"trim=duration={dub_end_time:.4f},setpts=PTS-STARTPTS")
+            elif duration < dub_end_time:
+                speed_factor = duration / dub_end_time
+                video_label = graph.add([video_label], f"setpts=PTS/{speed_factor:.6f},fps={self.fps}")
+
+                if self.error_handler:
+                    self.error_handler.info(f"INFO: Section {section.id}, dubed SOT is too long. Slowing down SOT with factor {speed_factor}")
+            duration = dub_end_time
+
+        if section.is_interview():
+            video_label = self.compile_overlay(graph, video_label, editor._create_byline_overlay(section.name, section.title, self.output_resolution))
+        if editor.add_courtesy and section.clip.courtesy:
+            video_label = self.compile_overlay(graph, video_label, editor._create_courtesy_overlay(section.clip.courtesy, self.output_resolution))
+
+        duration = duration - 0.1
+        fade_duration = (1.0/self.fps)*2
+        video_label = self.pad_video(graph, video_label, duration)
+        audio_label = graph.add([audio_label], f"apad,atrim=duration={duration:.4f},asetpts=PTS-STARTPTS,"
+                                               f"afade=t=in:st=0:d={fade_duration:.4f},afade=t=out:st={duration - fade_duration:.4f}:d={fade_duration:.4f}")
+        return video_label, audio_label, duration
+
+    def compile_anchor_section(self, graph: FilterGraph, section: AnchorScriptSection) -> Optional[Tuple[str, str, float]]:
+        """Mirrors VideoEditor._process_anchor_section."""
+        broll_labels = []
+        broll_duration = 0.0
+        for broll_info in section.brolls:
+            if broll_info["id"] == "Anchor":
+                broll_labels.append(self.compile_anchor(graph, broll_info, section))
+            else:
+                broll_labels.append(self.compile_broll(graph, broll_info))
+            broll_duration += broll_info["end"] - broll_info["start"]
+
+        if not broll_labels:
+            if self.error_handler:
+                self.error_handler.warning(f"Anchor section {section.id} had no broll. Skipping section in final video.")
+            return None
+        voiceover_duration = section.anchor_audio_clip.duration
+
+        if broll_duration < voiceover_duration:
+            speed_factor = broll_duration / voiceover_duration
+            if speed_factor > 0.7:
+                if speed_factor < 0.99:
+                    if self.error_handler:
+                        self.error_handler.info(f"INFO: Brolls in section {section.id} are too short, adjusting speed ({speed_factor:.2f})")
+                video_label = self.concat_video(graph, broll_labels)
+                video_label = graph.add([video_label], f"setpts=PTS/{speed_factor:.6f},fps={self.fps}")
+            else:
+                if self.error_handler:
+                    self.error_handler.info(f"INFO: Brolls in section {section.id} are too short, adding Anchor shot")
+                broll_labels.append(self.compile_anchor(graph, {"start": broll_duration, "end": voiceover_duration}, section))
+                video_label = self.concat_video(graph, broll_labels)
+        else:
+            video_label = self.concat_video(graph, broll_labels)
+
+        duration = voiceover_duration - 0.1
+        video_label = self.pad_video(graph, video_label, duration)
+        audio_idx = graph.add_input(section.anchor_audio_file)
+        audio_label = graph.add([f"{audio_idx}:a"], f"{self.audio_format()},apad,atrim=duration={duration:.4f}")
+        return video_label, audio_label, duration
+
+    def compile_anchor(self, graph: FilterGraph, broll_info: Dict, section: AnchorScriptSection) -> str:
+        """Mirrors VideoEditor._load_and_process_anchor."""
+        anchor_start = broll_info["start"]
+        anchor_end = broll_info["end"]
+        if section.anchor_video_file is None and section.anchor_image_file is not None:
+            input_idx = graph.add_input(self.still_image_file(section.anchor_image_file), duration=anchor_end - anchor_start, still_fps=self.fps)
+            return self.pad_video(graph, self.compile_video_source(graph, input_idx), anchor_end - anchor_start)
+        input_idx = graph.add_input(section.anchor_video_file, start=anchor_start, duration=anchor_end - anchor_start)
+        return self.pad_video(graph, self.compile_video_source(graph, input_idx), anchor_end - anchor_start)
+
+    def compile_broll(self, graph: FilterGraph, broll_info: Dict) -> str:
+        """Mirrors VideoEditor._load_and_process_broll. B-roll audio is replaced by the voiceover so it is not decoded."""
+        clip = self.clip_manager.get_clip(broll_info["id"])
+        broll_duration = broll_info["end"] - broll_info["start"]
+
+        source = clip.source_range
+        input_idx = graph.add_input(source.source_file, start=source.start or None, duration=min(broll_duration, clip.duration))
+        video_label = f"{input_idx}:v"
+        if clip.duration < broll_duration:
+            speed_factor = clip.duration / broll_duration
+            if speed_factor > 0.7:
+                if speed_factor < 0.99:
+                    if self.error_handler:
+                        self.error_handler.info(f"INFO: Broll {broll_info['id']} is too short, adjusting speed ({speed_factor:.2f})")
+            else:
+                if self.error_handler:
+                    self.error_handler.info(f"INFO: Broll {broll_info['id']} is too short, video will be slow ({speed_factor:.2f}).")
+            video_label = graph.add([video_label], f"setpts=(PTS-STARTPTS)/{speed_factor:.6f}")
+
+        video_label = self.pad_video(graph, self.compile_video_source(graph, video_label), broll_duration)
+        if self.video_editor.add_courtesy and clip.courtesy:
+            video_label = self.compile_overlay(graph, video_label, self.video_editor._create_courtesy_overlay(clip.courtesy, self.output_resolution))
+        return video_label
+
+    def image_file(self, image, prefix: str) -> Path:
+        """Writes a PNG named by its content and size.
+
+        Renders share the work folder (e.g. a preview while the final render runs), so files are
+        never overwritten, and they're written to a temporary file first so FFmpeg never reads
+        a partly written one.
+        """
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        data = buffer.getvalue()
+        width, height = image.size
+        file = self.work_folder / f"{prefix}_{hashlib.sha256(data).hexdigest()[:16]}_{width}x{height}.png"
+        if not file.exists():
+            tmp_file = file.with_name(f"{file.stem}_{os.getpid()}_{threading.get_ident()}.tmp")
+            tmp_file.write_bytes(data)
+            tmp_file.replace(file)
+        return file
+
+    def still_image_file(self, image_file: Path) -> Path:
+        """Writes the image resized to the output resolution once, so looping it needs no scaling."""
+        if image_file not in self.still_files:
+            self.still_files[image_file] = self.image_file(load_still_image(str(image_file), tuple(self.output_resolution)), f"still_{image_file.stem}")
+        return self.still_files[image_file]
+
+    def compile_video_source(self, graph: FilterGraph, source) -> str:
+        """Normalizes a video stream (input index or label) to the output fps, resolution and pixel format."""
+        if isinstance(source, int):
+            source = f"{source}:v"
+        width, height = self.output_resolution
+        return graph.add([source], f"setpts=PTS-STARTPTS,fps={self.fps},"
+                                   f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},setsar=1,format=yuv420p")
+
+    def compile_overlay(self, graph: FilterGraph, video_label: str, overlay) -> str:
+        """Overlays a cropped RGBA graphic at its position for the whole duration of the stream."""
+        if id(overlay) not in self.overlay_files:
+            overlay_file = self.image_file(overlay.image, "overlay")
+            self.overlay_files[id(overlay)] = (overlay, overlay_file) # keep a reference so the id stays unique
+        overlay_file = self.overlay_files[id(overlay)][1]
+        x, y = overlay.position
+        return graph.add([video_label, graph.add_image_input(overlay_file)], f"overlay={x}:{y}:eof_action=repeat:format=auto,format=yuv420p")
+
+    def compile_music(self, graph: FilterGraph, audio_label: str, duration: float) -> str:
+        """Mirrors VideoEditor._add_background_music."""
+        music_file = self.video_editor.music_file
+        gain = loudness_gain_db(measure_loudness_file(music_file), -40, cap=True)
+        music_idx = graph.add_input(music_file, loop=True)
+        music_label = graph.add([f"{music_idx}:a"], f"{self.audio_format()},volume={gain:.3f}dB,atrim=duration={duration:.4f}")
+        return graph.add([audio_label, music_label], "amix=inputs=2:duration=first:normalize=0")
+
+    def concat_video(self, graph: FilterGraph, video_labels: List[str]) -> str:
+        if len(video_labels) == 1:
+            return video_labels[0]
+        return graph.add(video_labels, f"concat=n={len(video_labels)}:v=1:a=0")
+
+    def pad_video(self, graph: FilterGraph, video_label: str, duration: float) -> str:
+        """Holds the last frame (like moviepy's set_duration) and cuts the stream to exactly duration."""
+        return graph.add([video_label], f"tpad=stop_mode=clone:stop_duration={duration:.4f},trim=duration={duration:.4f},setpts=PTS-STARTPTS")
+
+    def audio_format(self) -> str:
+        return "aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo,asetpts=PTS-STARTPTS"
+
+    def encode_options(self, threads: int = 8) -> List[str]:
+        """Encoding options, kept identical across segments so they can be joined with stream copy."""
+        return ["-r", str(self.fps), *self.video_editor.render_profile.codec_options(), "-pix_fmt", "yuv420p",
+                "-ar", "44100", "-ac", "2", "-video_track_timescale", "30000",
+                "-threads", str(threads), "-movflags", "+faststart"]
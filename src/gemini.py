@@ -28,9 +28,6 @@ from vertexai.generative_models import (GenerationConfig, GenerativeModel,
                                          HarmBlockThreshold, HarmCategory,
                                          SafetySetting)
 
-import moviepy.editor as mp
-from PIL import Image
-
 # Gemini Initialization 
 vertexai.init(project="stg-transcription", location="us-central1")
 
@@ -66,44 +63,20 @@ GEMINI = GenerativeModel(model_name="gemini-1.5-pro-preview-0409",
                          generation_config=GENERATION_CONFIG, 
                          safety_settings=SAFETY_CONFIG)
 
-def extract_frame(input_file: Path, time: float, output_file: Path) -> None:
-    """Extracts a frame from a video at a specific time and saves it as an image.
-
-    Args:
-        input_file: Path to the input video file.
-        time: Time in seconds to extract the frame from.
-        output_file: Path to save the extracted frame image.
-    """
-    with mp.VideoFileClip(str(input_file)) as video:
-        frame = video.get_frame(time)
-        image = Image.fromarray(frame)
-        
-        if not output_file.exists():
-            image.save(output_file)
+def extract_middle_frame_and_audio(clip: Clip) -> Tuple[Path, Path]:
+    """Extracts the middle frame and audio from a clip.
 
-def extract_middle_frame_and_audio(input_file: Path) -> Tuple[Path, Path]:
-    """Extracts the middle frame and audio from a video.
+    Only the clip's range of its source video is read, so the clip file isn't needed.
 
     Args:
-        input_file: Path to the input video file.
+        clip: The clip to extract from.
 
     Returns:
         A tuple containing:
             - Path to the extracted frame image.
             - Path to the extracted audio file. 
     """
-    frame_output = input_file.with_suffix(".jpg")
-    audio_output = input_file.with_suffix(".mp3")
-
-    with mp.VideoFileClip(str(input_file)) as video:
-        # Extract middle frame
-        extract_frame(input_file, video.duration / 2, frame_output)
-
-        # Extract audio
-        if not audio_output.exists():
-            video.audio.write_audiofile(str(audio_output), logger=None)
-
-    return frame_output, audio_output 
+    return clip.extract_frame(clip.duration / 2), clip.extract_audio()
 
 @st.cache_data(show_spinner=False, hash_funcs={Clip: lambda x: x.__repr__()})
 def describe_clips(clips: List[Clip], shotlist: str, previous_shot_id, next_shot_id) -> Dict:
@@ -148,7 +121,7 @@ Here are the clips:
 
     for clip in clips:
         name = clip.id
-        frame_file, audio_file = extract_middle_frame_and_audio(clip.file_path)
+        frame_file, audio_file = extract_middle_frame_and_audio(clip)
 
         content += ["<clip>\n"]
         content += [f"ID {name}:", gcs.upload_to_gcs_part(frame_file), gcs.upload_to_gcs_part(audio_file)]
@@ -387,8 +360,7 @@ First, review the available B-roll clips:
     
     for clip in clips:
         duration = clip.duration
-        frame_file = clip.file_path.with_suffix(".jpg")
-        extract_frame(clip.file_path, min(duration, 1.0), frame_file)
+        frame_file = clip.extract_frame(min(duration, 1.0))
         if not clip.has_quote:
             clip_section = [f"<clip {clip.id}>\n", gcs.upload_to_gcs_part(frame_file), f"\n{clip.full_description}\n\nMax duration: {duration} seconds\n</clip {clip.id}>\n"]
         elif clip.id not in sot_clip_ids:
@@ -0,0 +1,211 @@
+# Graphics
+
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from PIL import Image, ImageDraw, ImageFont
+import numpy as np
+
+# Only used for measuring text, drawing happens on per-graphic images
+_measure_draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+
+@lru_cache(maxsize=256)
+def load_font(font_path: Optional[str], font_size: int) -> ImageFont.ImageFont:
+    """Loads a font once per (font, size)."""
+    if not font_path:
+        return ImageFont.load_default()
+    return ImageFont.truetype(font_path, font_size)
+
+def text_height(font_path: str, font_size: int, text: str) -> int:
+    text_bbox = _measure_draw.textbbox((0, 0), text, font=load_font(font_path, font_size))
+    return text_bbox[3] - text_bbox[1]
+
+@lru_cache(maxsize=1024)
+def font_size_for_height(font_path: str, desired_height: int, text: str) -> int:
+    """Returns the largest font size whose rendered text is shorter than desired_height.
+
+    Binary search over font sizes, equivalent to counting up from size 1.
+    """
+    high = max(desired_height, 2)
+    while text_height(font_path, high, text) < desired_height:
+        high *= 2
+    low = 1 # invariant: text at size low is shorter than desired_height (or low is the minimum), high is not
+    while high - low > 1:
+        middle = (low + high) // 2
+        if text_height(font_path, middle, text) < desired_height:
+            low = middle
+        else:
+            high = middle
+    return max(high - 1, 1)
+
+@lru_cache(maxsize=256)
+def raw_text_image(text: str, height: int, text_color: Tuple[int, int, int, int], font_path: Optional[str]) -> Image.Image:
+    """Creates a transparent image with the given text, cropped to the text width."""
+    if font_path:
+        font = load_font(font_path, font_size_for_height(font_path, height, text))
+    else:
+        font = load_font(None, 0)
+
+    ref_text_bbox = _measure_draw.textbbox((0, 0), text, font=font)
+    ref_text_width = ref_text_bbox[2] - ref_text_bbox[0]
+    text_x = 0
+    text_y = -ref_text_bbox[1]
+
+    text_image = Image.new("RGBA", (ref_text_width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(text_image)
+    draw.text((text_x, text_y), text, font=font, fill=text_color)
+    return text_image
+
+@lru_cache(maxsize=64)
+def text_image(text: str, width: int, height: int, text_x: int, font_path: Optional[str]) -> Image.Image:
+    """Creates a transparent image with the given text, vertically centered."""
+    if font_path:
+        font = load_font(font_path, font_size_for_height(font_path, int(height * (59/150)), text))
+    else:
+        font = load_font(None, 0)
+
+    reference_char = "H"
+    ref_text_bbox = _measure_draw.textbbox((0, 0), reference_char, font=font)
+    ref_text_height = ref_text_bbox[3] - ref_text_bbox[1]
+    text_y = -ref_text_bbox[1] + (height - ref_text_height) // 2
+
+    text_image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(text_image)
+    draw.text((text_x, text_y), text, font=font, fill=(0, 0, 0, 255))
+    return text_image
+
+@lru_cache(maxsize=8)
+def logo_image(logo_path: str, height: int) -> Image.Image:
+    logo = Image.open(logo_path).convert("RGBA")
+    logo_width = int(round(logo.width * height / logo.height))
+    return logo.resize((logo_width, height), Image.LANCZOS)
+
+@dataclass(frozen=True, eq=False)
+class CroppedOverlay:
+    """The visible part of a full-frame overlay, and where it goes on a frame of size."""
+    image: Image.Image
+    position: Tuple[int, int]
+    size: Tuple[int, int]
+
+def crop_overlay(overlay: Image.Image) -> CroppedOverlay:
+    """Crops a full-frame overlay to its visible area, so only that is kept in memory."""
+    box = overlay.getbbox() or (0, 0, 0, 0)
+    return CroppedOverlay(overlay.crop(box), (box[0], box[1]), overlay.size)
+
+@lru_cache(maxsize=64)
+def courtesy_overlay(courtesy_text: str, size: Tuple[int, int], padding: int, font_path: Optional[str]) -> CroppedOverlay:
+    """Creates a full-frame transparent image with the courtesy graphic, cropped to it."""
+
+    output_width, output_height = size
+    courtesy_height = int(output_height * (54/1080))
+    courtesy_margin = padding
+
+    inner_content_height = int(courtesy_height * (24/54))
+    courtesy_padding = (courtesy_height - inner_content_height) // 2
+
+    courtesy_text_image = raw_text_image(courtesy_text.upper(), inner_content_height, (255, 255, 255, 255), font_path)
+    inner_content_width = courtesy_text_image.width
+    courtesy_width = inner_content_width + courtesy_padding * 2
+
+    courtesy_x = courtesy_margin
+    courtesy_y = courtesy_margin
+
+    overlay = Image.new("RGBA", size, (0, 0, 0, 0))
+    overlay.paste(Image.new("RGBA", (courtesy_width, courtesy_height), (0, 5, 52, int(255 * 0.5))), (courtesy_x, courtesy_y))
+
+    inner_content_x = courtesy_x + courtesy_padding
+    inner_content_y = courtesy_y + courtesy_padding
+    overlay.alpha_composite(courtesy_text_image, (inner_content_x, inner_content_y))
+    return crop_overlay(overlay)
+
+@lru_cache(maxsize=64)
+def byline_overlay(name: str, title: str, size: Tuple[int, int], padding: int, font_path: Optional[str]) -> CroppedOverlay:
+    """Creates a full-frame transparent image with the byline graphic, above the logline, cropped to it."""
+
+    output_width, output_height = size
+    bottom_margin = 2
+
+    byline_height = int(output_height * (162/1080))
+    inner_content_height = int(byline_height * (82/162))
+    byline_padding = (byline_height - inner_content_height) // 2
+
+    top_inner_content_height = int(inner_content_height * (33/82))
+    bottom_inner_content_height = int(inner_content_height * (25/82))
+    middle_inner_content_spacing = inner_content_height - top_inner_content_height - bottom_inner_content_height
+
+    name_text_image = raw_text_image(name.upper(), top_inner_content_height, (255, 255, 255, 255), font_path)
+    title_text_image = raw_text_image(title.upper(), bottom_inner_content_height, (255, 255, 255, 255), font_path)
+
+    inner_content_width = max(name_text_image.width, title_text_image.width)
+    byline_width = inner_content_width + byline_padding * 2
+
+    byline_x = padding
+    logline_height = int(output_height * (150/1080))
+    byline_y = output_height - padding - byline_height - logline_height - bottom_margin
+
+    overlay = Image.new("RGBA", size, (0, 0, 0, 0))
+    overlay.paste(Image.new("RGBA", (byline_width, byline_height), (0, 5, 52, int(255 * 0.9))), (byline_x, byline_y))
+
+    name_x = byline_x + byline_padding
+    name_y = byline_y + byline_padding
+    overlay.alpha_composite(name_text_image, (name_x, name_y))
+
+    title_x = byline_x + byline_padding
+    title_y = byline_y + byline_padding + top_inner_content_height + middle_inner_content_spacing
+    overlay.alpha_composite(title_text_image, (title_x, title_y))
+    return crop_overlay(overlay)
+
+@lru_cache(maxsize=16)
+def logline_overlay(logline_text: str, size: Tuple[int, int], padding: int, font_path: Optional[str], logo_path: Optional[str]) -> CroppedOverlay:
+    """Creates a full-frame transparent image with the logline graphic and logo, cropped to them."""
+
+    output_width, output_height = size
+    logo_logline_padding = 2
+
+    # Calculate logline dimensions based on video resolution and padding
+    logline_height = int(output_height * (150/1080))  # 10% of video height
+    logline_width = output_width - padding * 2
+    if logo_path:
+        logline_width -= logline_height
+        logline_width -= logo_logline_padding
+
+    logline_x = padding
+    logline_y = output_height - padding - logline_height
+
+    # 1. White background
+    overlay = Image.new("RGBA", size, (0, 0, 0, 0))
+    overlay.paste(Image.new("RGBA", (logline_width, logline_height), (255, 255, 255, int(255 * 0.9))), (logline_x, logline_y))
+
+    # 2. Text
+    overlay.alpha_composite(text_image(logline_text.upper(), logline_width, logline_height, padding // 2, font_path), (logline_x, logline_y))
+
+    # 3. Logo (if provided)
+    if logo_path:
+        overlay.alpha_composite(logo_image(logo_path, logline_height), (logline_x + logline_width + logo_logline_padding, logline_y))
+
+    return crop_overlay(overlay)
+
+class StaticOverlay:
+    """A premultiplied RGBA overlay, cropped to its visible area, that can be blended onto frames."""
+
+    def __init__(self, overlay: Union[CroppedOverlay, Image.Image]):
+        if isinstance(overlay, Image.Image):
+            overlay = crop_overlay(overlay)
+        x, y = overlay.position
+        self.box = (x, y, x + overlay.image.width, y + overlay.image.height)
+        rgba = np.asarray(overlay.image, dtype=np.float32) / 255.0
+        alpha = rgba[..., 3:4]
+        self.premultiplied = rgba[..., :3] * alpha * 255.0
+        self.inverse_alpha = 1.0 - alpha
+
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        """Blends the overlay onto a frame of the overlay's size (out = frame * (1 - a) + rgb * a)."""
+        x1, y1, x2, y2 = self.box
+        if x1 == x2 or y1 == y2:
+            return frame
+        frame = frame.copy()
+        region = frame[y1:y2, x1:x2].astype(np.float32)
+        frame[y1:y2, x1:x2] = np.clip(region * self.inverse_alpha + self.premultiplied + 0.5, 0, 255).astype(np.uint8)
+        return frame
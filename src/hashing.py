@@ -1,8 +1,9 @@
 import hashlib
 from pathlib import Path, PosixPath
-import moviepy.editor as mp
 from langchain_core.runnables.base import RunnableBinding
 
+from src.probe import probe_media
+
 def sha256sum(file: PosixPath):
     if file.exists():
         with open(file, 'rb', buffering=0) as f:
@@ -10,8 +11,18 @@ def sha256sum(file: PosixPath):
     else:
         return str(file.resolve())
 
+_file_digests = {}
+
+def cached_sha256sum(file: PosixPath):
+    """sha256sum memoized per process by path, modification time and size."""
+    stat = file.stat()
+    key = (str(file.resolve()), stat.st_mtime_ns, stat.st_size)
+    if key not in _file_digests:
+        _file_digests[key] = sha256sum(file)
+    return _file_digests[key]
+
 def hash_audio_file(path: PosixPath):
-    return str(path.resolve()) + str(mp.AudioFileClip(str(path)).duration)
+    return str(path.resolve()) + str(probe_media(path).duration)
 
 def hash_ignore(_):
     return 0
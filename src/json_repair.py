@@ -0,0 +1,110 @@
+# JSONRepair
+
+from typing import Any
+import json
+import re
+
+VALUE_END = ('"', "}", "]")
+
+def _next_significant(text: str, i: int):
+    """Returns the next non-whitespace character after i and whether a newline was skipped."""
+    newline = False
+    while i < len(text) and text[i].isspace():
+        newline = newline or text[i] == "\n"
+        i += 1
+    return (text[i] if i < len(text) else ""), newline
+
+def repair_json(text: str) -> str:
+    """Fixes the mistakes LLMs typically make in JSON, without another model call.
+
+    Handles code fences and surrounding prose, trailing commas, missing commas between lines,
+    unescaped double quotes and raw newlines inside strings, Python literals, and output
+    that was cut off (open strings and brackets are closed).
+    """
+    text = re.sub(r"^\s*```(?:json)?\s*|\s*```\s*$", "", text.strip())
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if starts:
+        text = text[min(starts):]
+
+    output = []
+    stack = []
+    in_string = False
+    escaped = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+                output.append(char)
+            elif char == "\\":
+                escaped = True
+                output.append(char)
+            elif char == '"':
+                next_char, newline = _next_significant(text, i + 1)
+                if next_char in (",", "}", "]", ":", "") or (next_char == '"' and newline):
+                    in_string = False
+                    output.append(char)
+                else:
+                    # A quote inside the text, e.g. SHOUTING: "NO JUSTICE"
+                    output.append('\\"')
+            elif char == "\n":
+                output.append("\\n")
+            elif char == "\t":
+                output.append("\\t")
+            else:
+                output.append(char)
+            i += 1
+            continue
+
+        if char.isspace():
+            output.append(char)
+            i += 1
+            continue
+
+        previous = next((c for c in reversed(output) if not c.isspace()), "")
+        starts_value = char in '"{[-' or char.isalnum()
+        if starts_value and stack and (previous in VALUE_END or previous.isalnum()):
+            output.append(",")
+
+        if char == '"':
+            in_string = True
+            output.append(char)
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            output.append(char)
+        elif char in "}]":
+            while output and (output[-1].isspace() or output[-1] == ","):
+                output.pop()
+            if stack:
+                output.append(stack.pop())
+            if not stack:
+                break
+        elif char == "-" or char.isdigit():
+            number = re.match(r"-?\d*(?:\.\d+)?(?:[eE][+-]?\d+)?", text[i:]).group(0) or char
+            output.append(number)
+            i += len(number)
+            continue
+        elif char.isalpha():
+            word = re.match(r"[A-Za-z_]+", text[i:]).group(0)
+            output.append({"True": "true", "False": "false", "None": "null"}.get(word, word))
+            i += len(word)
+            continue
+        else:
+            output.append(char)
+        i += 1
+
+    # Close whatever a truncated response left open
+    if in_string:
+        output.append('"')
+    while output and (output[-1].isspace() or output[-1] in ",:"):
+        output.pop()
+    output.extend(reversed(stack))
+    return "".join(output)
+
+def parse_json(text: str) -> Any:
+    """Parses JSON, repairing it locally if it isn't valid as is."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(text))
@@ -0,0 +1,67 @@
+# LLMCache
+
+from pathlib import Path
+from typing import Dict, Optional
+import threading
+import hashlib
+import json
+import os
+
+# Point this at a mounted volume (e.g. a GCS bucket) to share responses across jobs and the Streamlit app
+LLM_CACHE_FOLDER = Path(os.environ.get("LLM_CACHE_FOLDER", "/tmp/llm_cache"))
+
+def chain_cache_key(chain, params: Dict) -> str:
+    """Hashes everything that decides a chain's response: its name, prompt template, model and inputs."""
+    sequence = getattr(chain, "bound", chain)
+    prompt = getattr(sequence, "first", None)
+    model = getattr(sequence, "last", None)
+    key = {
+        "run_name": chain.config.get("run_name") if hasattr(chain, "config") else None,
+        "template": hashlib.sha256(getattr(prompt, "template", "").encode()).hexdigest(),
+        "model": getattr(model, "model", None),
+        "max_tokens": getattr(model, "max_tokens", None),
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+class LLMCache:
+    """Stores raw LLM responses as files named by their chain cache key.
+
+    Unlike st.cache_data, responses outlive the process, so batch jobs and reruns of a story
+    skip every chain call whose prompt, model and inputs haven't changed.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _cache_file(self, key: str) -> Path:
+        return self.folder / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._cache_file(key), "r") as f:
+                response = json.load(f)["response"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return response
+
+    def put(self, key: str, response: str, run_name: Optional[str] = None):
+        cache_file = self._cache_file(key)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f"{cache_file.stem}.{threading.get_ident()}.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump({"run_name": run_name, "response": response}, f)
+        tmp_file.replace(cache_file)
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        return f"LLM cache: {self.hits} hits, {self.misses} misses ({self.hits / total if total else 0:.0%} hit rate)"
+
+llm_cache = LLMCache(LLM_CACHE_FOLDER)
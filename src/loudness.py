@@ -0,0 +1,146 @@
+# Loudness
+
+# STREAMLIT
+from src.ffmpeg import get_ffmpeg_binary
+from src.hashing import cached_sha256sum
+# /STREAMLIT
+
+from collections import deque
+from pathlib import Path
+from typing import Optional
+import subprocess
+import threading
+import tempfile
+import json
+import os
+
+import numpy as np
+from scipy.signal import lfilter
+
+RATE = 48000
+CHUNK_SAMPLES = RATE # 1 second of audio per read from FFmpeg
+
+LOUDNESS_CACHE_FOLDER = Path(os.environ.get("LOUDNESS_CACHE_FOLDER", "/tmp/loudness_cache"))
+_cache_lock = threading.Lock()
+
+# ITU-R BS.1770 K-weighting at 48 kHz: high shelf followed by high pass
+K_WEIGHTING_FILTERS = [
+    (np.array([1.53512485958697, -2.69169618940638, 1.19839281085285]), np.array([1.0, -1.69065929318241, 0.73248077421585])),
+    (np.array([1.0, -2.0, 1.0]), np.array([1.0, -1.99004745483398, 0.99007225036621])),
+]
+
+class LoudnessMeter:
+    """Incremental ITU-R BS.1770 integrated loudness meter for mono 48 kHz audio.
+
+    Audio is fed in arbitrary sized chunks; only the filter state, a partial 100 ms step
+    and one power value per gating block are kept, so memory doesn't grow with the samples.
+    """
+
+    def __init__(self, block_size: float = 0.4, overlap: float = 0.75):
+        self.step_samples = int(round(RATE * block_size * (1 - overlap)))
+        self.steps_per_block = int(round(1 / (1 - overlap)))
+        self.filter_states = [np.zeros(max(len(a), len(b)) - 1) for b, a in K_WEIGHTING_FILTERS]
+        self.step_energies = deque(maxlen=self.steps_per_block)
+        self.leftover = np.zeros(0)
+        self.block_powers = []
+        self.total_energy = 0.0
+        self.total_samples = 0
+
+    def add(self, samples: np.ndarray):
+        """Adds samples (mono, or with channels on the last axis which are averaged)."""
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        if not len(samples):
+            return
+        for i, (b, a) in enumerate(K_WEIGHTING_FILTERS):
+            samples, self.filter_states[i] = lfilter(b, a, samples, zi=self.filter_states[i])
+        squares = np.concatenate([self.leftover, samples.astype(np.float64) ** 2])
+        self.total_energy += float(squares[len(self.leftover):].sum())
+        self.total_samples += len(samples)
+
+        num_steps = len(squares) // self.step_samples
+        step_sums = squares[:num_steps * self.step_samples].reshape(num_steps, self.step_samples).sum(axis=1)
+        self.leftover = squares[num_steps * self.step_samples:]
+        for step_sum in step_sums:
+            self.step_energies.append(step_sum)
+            if len(self.step_energies) == self.steps_per_block:
+                self.block_powers.append(sum(self.step_energies) / (self.step_samples * self.steps_per_block))
+
+    def integrated_loudness(self) -> float:
+        """Returns the gated integrated loudness in LUFS (-inf for silence)."""
+        if self.block_powers:
+            powers = np.array(self.block_powers)
+        elif self.total_samples:
+            # Shorter than one gating block, measure it as a single block
+            powers = np.array([self.total_energy / self.total_samples])
+        else:
+            return float("-inf")
+
+        with np.errstate(divide="ignore"):
+            block_loudness = -0.691 + 10 * np.log10(powers)
+        powers = powers[block_loudness >= -70.0] # absolute gate
+        if not len(powers):
+            return float("-inf")
+        relative_gate = -0.691 + 10 * np.log10(powers.mean()) - 10.0
+        with np.errstate(divide="ignore"):
+            powers = powers[-0.691 + 10 * np.log10(powers) > relative_gate] # relative gate
+        if not len(powers):
+            return float("-inf")
+        return float(-0.691 + 10 * np.log10(powers.mean()))
+
+def stream_loudness_file(file: Path, start: float = 0.0, end: Optional[float] = None) -> float:
+    """Measures loudness by reading fixed size blocks of decoded audio from an FFmpeg pipe."""
+    command = [get_ffmpeg_binary(), "-v", "error", "-nostdin"]
+    if start:
+        command += ["-ss", f"{start:.3f}"]
+    command += ["-i", str(file)]
+    if end is not None:
+        command += ["-t", f"{max(end - start, 0.0):.3f}"]
+    command += ["-vn", "-ac", "2", "-ar", str(RATE), "-f", "f32le", "-"]
+
+    meter = LoudnessMeter()
+    frame_bytes = 2 * 4 # stereo float32
+    remainder = b""
+    # stderr goes to a file rather than a pipe, so a chatty decoder can't block on it
+    with tempfile.TemporaryFile() as stderr, subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr) as process:
+        while True:
+            data = process.stdout.read(CHUNK_SAMPLES * frame_bytes)
+            if not data:
+                break
+            data = remainder + data
+            usable = len(data) - len(data) % frame_bytes
+            remainder = data[usable:]
+            meter.add(np.frombuffer(data[:usable], dtype=np.float32).reshape(-1, 2))
+        if process.wait() != 0:
+            # A failed decode would otherwise be measured (and cached) as silence or a partial file
+            stderr.seek(0)
+            raise RuntimeError(f"FFmpeg failed decoding {file} with code {process.returncode}: {stderr.read().decode(errors='replace')}")
+    return meter.integrated_loudness()
+
+def measure_loudness_file(file: Path, start: float = 0.0, end: Optional[float] = None, cache: bool = True) -> float:
+    """Returns the integrated loudness of (a time range of) an audio/video file, memoized by file digest."""
+    file = Path(file)
+    if not cache:
+        return stream_loudness_file(file, start, end)
+
+    cache_file = LOUDNESS_CACHE_FOLDER / f"{cached_sha256sum(file)}.json"
+    range_key = f"{start:.3f}-{end:.3f}" if end is not None else f"{start:.3f}-"
+    with _cache_lock:
+        if cache_file.exists():
+            with open(cache_file, "r") as f:
+                cached = json.load(f)
+            if range_key in cached:
+                return cached[range_key]
+
+    loudness = stream_loudness_file(file, start, end)
+
+    with _cache_lock:
+        cached = {}
+        if cache_file.exists():
+            with open(cache_file, "r") as f:
+                cached = json.load(f)
+        cached[range_key] = loudness
+        LOUDNESS_CACHE_FOLDER.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, "w") as f:
+            json.dump(cached, f)
+    return loudness
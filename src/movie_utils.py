@@ -1,7 +1,10 @@
 import moviepy.editor as mp
-import pyloudnorm as pyln
 import numpy as np
-from functools import partial
+from PIL import Image
+from functools import lru_cache
+from typing import Optional
+
+from src.loudness import LoudnessMeter
 
 def resize_image_clip(image_clip, target_resolution):
     target_width, target_height = target_resolution
@@ -25,18 +28,47 @@ def resize_image_clip(image_clip, target_resolution):
 
     return cropped_clip
 
-def cap_loudness(clip: mp.VideoFileClip, max_lufs=-30):
-    adjusted_audio = cap_loudness_audio_clip(clip.audio, max_lufs=max_lufs)
-    return clip.set_audio(adjusted_audio)
+@lru_cache(maxsize=8)
+def load_still_image(image_path: str, target_resolution) -> Image.Image:
+    """Loads an image resized and center cropped to fill target_resolution, like resize_image_clip."""
+    target_width, target_height = target_resolution
+    image = Image.open(image_path).convert("RGB")
+
+    width_ratio = target_width / image.width
+    height_ratio = target_height / image.height
 
-def cap_loudness_audio_clip(clip: mp.AudioFileClip, max_lufs=-30):
-    clip.to_soundarray = partial(to_soundarray, clip)
-    audio_data = clip.to_soundarray(fps=48000)
-    if audio_data.ndim > 1:
-        audio_data = audio_data.mean(axis=1)
+    if width_ratio > height_ratio:
+        resized_size = (target_width, round(image.height * width_ratio))
+    else:
+        resized_size = (round(image.width * height_ratio), target_height)
+    image = image.resize(resized_size, Image.LANCZOS)
+
+    left = (image.width - target_width) // 2
+    top = (image.height - target_height) // 2
+    return image.crop((left, top, left + target_width, top + target_height))
+
+def measure_loudness_audio_clip(clip: mp.AudioFileClip) -> float:
+    """Returns the integrated loudness of the clip in LUFS, decoding it in one second chunks."""
+    meter = LoudnessMeter()
+    for chunk in clip.iter_chunks(fps=48000, chunksize=48000):
+        meter.add(np.asarray(chunk, dtype=np.float64))
+    return meter.integrated_loudness()
+
+def loudness_gain_db(current_loudness: float, target_lufs: float, cap: bool = False) -> float:
+    """Returns the gain in dB that set_loudness (or cap_loudness when cap=True) would apply."""
+    if not np.isfinite(current_loudness): # silent audio
+        return 0.0
+    if cap and current_loudness < target_lufs:
+        return 0.0
+    return target_lufs - current_loudness
+
+def cap_loudness(clip: mp.VideoFileClip, max_lufs=-30, loudness: Optional[float] = None):
+    adjusted_audio = cap_loudness_audio_clip(clip.audio, max_lufs=max_lufs, loudness=loudness)
+    return clip.set_audio(adjusted_audio)
 
-    meter = pyln.Meter(rate=48000, block_size=min(0.4, clip.duration)) # block_size must not exceed clip duration
-    current_loudness = meter.integrated_loudness(audio_data)
+def cap_loudness_audio_clip(clip: mp.AudioFileClip, max_lufs=-30, loudness: Optional[float] = None):
+    """Lowers the clip to max_lufs if it is louder. Pass loudness if it is already known (see measure_loudness_file)."""
+    current_loudness = measure_loudness_audio_clip(clip) if loudness is None else loudness
     if current_loudness < max_lufs:
         return clip
 
@@ -44,73 +76,13 @@ def cap_loudness_audio_clip(clip: mp.AudioFileClip, max_lufs=-30):
     adjusted_audio = clip.volumex(adjustment_factor)
     return adjusted_audio
 
-def set_loudness(clip: mp.VideoFileClip, target_lufs=-23):
-    adjusted_audio = set_loudness_audio_clip(clip.audio, target_lufs=target_lufs)
+def set_loudness(clip: mp.VideoFileClip, target_lufs=-23, loudness: Optional[float] = None):
+    adjusted_audio = set_loudness_audio_clip(clip.audio, target_lufs=target_lufs, loudness=loudness)
     return clip.set_audio(adjusted_audio)
 
-def set_loudness_audio_clip(clip: mp.AudioFileClip, target_lufs=-23):
-    clip.to_soundarray = partial(to_soundarray, clip)
-    audio_data = clip.to_soundarray(fps=48000)
-    if audio_data.ndim > 1:
-        audio_data = audio_data.mean(axis=1)
-    meter = pyln.Meter(rate=48000, block_size=min(0.4, clip.duration))
-    current_loudness = meter.integrated_loudness(audio_data)
-    
+def set_loudness_audio_clip(clip: mp.AudioFileClip, target_lufs=-23, loudness: Optional[float] = None):
+    """Sets the clip to target_lufs. Pass loudness if it is already known (see measure_loudness_file)."""
+    current_loudness = measure_loudness_audio_clip(clip) if loudness is None else loudness
     adjustment_factor = 10 ** ((target_lufs - current_loudness) / 20)
     adjusted_audio = clip.volumex(adjustment_factor)
     return adjusted_audio
-
-from moviepy.decorators import requires_duration
-
-@requires_duration
-def to_soundarray(
-    self, tt=None, fps=None, quantize=False, nbytes=2, buffersize=50000
-):
-    """
-    Transforms the sound into an array that can be played by pygame
-    or written in a wav file. See ``AudioClip.preview``.
-
-    Parameters
-    ------------
-
-    fps
-        Frame rate of the sound for the conversion.
-        44100 for top quality.
-
-    nbytes
-        Number of bytes to encode the sound: 1 for 8bit sound,
-        2 for 16bit, 4 for 32bit sound.
-
-    """
-    if fps is None:
-        fps = self.fps
-
-    stacker = np.vstack if self.nchannels == 2 else np.hstack
-    max_duration = 1.0 * buffersize / fps
-    if tt is None:
-        if self.duration > max_duration:
-            return stacker(
-                tuple(
-                    self.iter_chunks(
-                        fps=fps, quantize=quantize, nbytes=2, chunksize=buffersize
-                    )
-                )
-            )
-        else:
-            tt = np.arange(0, self.duration, 1.0 / fps)
-    """
-    elif len(tt)> 1.5*buffersize:
-        nchunks = int(len(tt)/buffersize+1)
-        tt_chunks = np.array_split(tt, nchunks)
-        return stacker([self.to_soundarray(tt=ttc, buffersize=buffersize, fps=fps,
-                                    quantize=quantize, nbytes=nbytes)
-                            for ttc in tt_chunks])
-    """
-    snd_array = self.get_frame(tt)
-
-    if quantize:
-        snd_array = np.maximum(-0.99, np.minimum(0.99, snd_array))
-        inttype = {1: "int8", 2: "int16", 4: "int32"}[nbytes]
-        snd_array = (2 ** (8 * nbytes - 1) * snd_array).astype(inttype)
-
-    return snd_array
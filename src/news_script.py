@@ -2,11 +2,12 @@
 
 # STREAMLIT
 from src.clip_manager import ClipManager, Clip
-from src.prompts import run_chain, run_chain_json, \
-                        spell_check_chain, get_sot_chain, reformat_chain, sot_chain, parse_chain, logline_chain, parse_sot_chain, headline_chain, match_sot_chain, match_hard_sot_chain, facts_chain, edit_chain, reformat_title_chain
+from src.prompts import run_chain, run_chain_json, MaxLength, ResponseValidationError, \
+                        reformat_chain, sot_chain, parse_chain, logline_chain, headline_chain, match_sot_chain, match_hard_sot_chain, edit_chain, reformat_title_chain
 from src.language import Language
 from src.tts import TTS
 from src.transcription import get_adjusted_timestamps
+from src.response_schemas import ParsedScriptResponse, LoglinesResponse
 # /STREAMLIT
 
 from typing import List, Optional
@@ -38,6 +39,7 @@ class AnchorScriptSection(ScriptSection):
         self.brolls: Optional[List] = None
 
         self.anchor_video_file: Optional[Path] = None
+        self.anchor_image_file: Optional[Path] = None # still anchor, used when there is no anchor video
     
     def __repr__(self):
         return f"""{self.text}
@@ -95,6 +97,9 @@ class NewsScript:
         self.dataloader = dataloader
         self.folder = folder
         self.error_handler = error_handler
+        self.artifacts = clip_manager.artifacts
+        self.artifacts.set_default("raw_storyline", storyline)
+        self.artifacts.set_default("raw_shotlist", shotlist)
 
         self.headline: Optional[str] = None
         self.sections: List[ScriptSection] = []
@@ -127,11 +132,17 @@ class NewsScript:
         return script
     
     def spell_check(self):
-        self.storyline = run_chain(spell_check_chain, {"INPUT": self.storyline})
-        self.shotlist = run_chain(spell_check_chain, {"INPUT": self.shotlist})
+        self.spell_check_storyline()
+        self.spell_check_shotlist()
+
+    def spell_check_storyline(self):
+        self.storyline = self.artifacts.get("storyline")
+
+    def spell_check_shotlist(self):
+        self.shotlist = self.artifacts.get("shotlist")
     
     def generate_facts(self):
-        self.facts_list = run_chain(facts_chain, {"SCRIPT": self.storyline, "SHOTLIST": self.shotlist})
+        self.facts_list = self.artifacts.get("facts")
         if self.error_handler:
             self.error_handler.stream_status(self.facts_list, "Generating list of facts")
     
@@ -157,12 +168,21 @@ class NewsScript:
         self.text_script = reformated_story
     
     def generate_lower_thirds(self):
+        self.generate_headline()
+        self.generate_loglines()
+        self.generate_bylines()
+
+    def generate_headline(self):
         self.headline = self._generate_headline()
         if self.error_handler:
             self.error_handler.stream_status(self.headline, "Generating headline")
+
+    def generate_loglines(self):
         self._generate_loglines()
         if self.error_handler:
             self.error_handler.stream_status(self.get_loglines(), "Generating loglines")
+
+    def generate_bylines(self):
         self._generate_bylines()
         if self.error_handler:
             self.error_handler.stream_status(self.get_bylines(), "Generating bylines")
@@ -241,9 +261,8 @@ class NewsScript:
         self._match_sot_clips_same_language(section, clip, other_language_substring)
 
     def _extract_sots(self) -> str:
-        """Extracts and parses soundbites (SOTs) from the shotlist."""
-        sots = run_chain(get_sot_chain, {"SHOTLIST": self.shotlist})
-        return sots
+        """Extracts and parses soundbites (SOTs) from the shotlist, shared with ClipManager."""
+        return self.artifacts.get("sots")
     
     def _reformat_story(self, story) -> str:
         reformated_story = run_chain(reformat_chain, {"STORY": story, "DATE": date.today().strftime("%B %d, %Y")})
@@ -264,7 +283,7 @@ class NewsScript:
 
     def _parse_script(self, story: str, sots: str):
         """Parses the storyline into individual ScriptSection objects."""
-        parsed_script_json = run_chain_json(parse_chain, {"QUOTATIONS": sots, "SCRIPT": story})
+        parsed_script_json = run_chain_json(parse_chain, {"QUOTATIONS": sots, "SCRIPT": story}, _schema=ParsedScriptResponse)
 
         for section_json in parsed_script_json["sections"]:
             section_type = section_json["type"]
@@ -281,7 +300,7 @@ class NewsScript:
             sections_text += f"Section {section.id}:\n"
             sections_text += f"{section.text}\n"
 
-        loglines_json = run_chain_json(logline_chain, {"SECTIONS": sections_text})
+        loglines_json = run_chain_json(logline_chain, {"SECTIONS": sections_text}, _schema=LoglinesResponse)
 
         anchor_script_sections = self.get_anchor_sections()
         loglines_sections = loglines_json["sections"]
@@ -295,7 +314,7 @@ class NewsScript:
     
     def _generate_bylines(self):
         """Generates info for bylines for each section in the script."""
-        parsed_sots = run_chain_json(parse_sot_chain, {"QUOTES": self.sots})
+        parsed_sots = self.artifacts.get("parsed_sots")
 
         for section in self.get_sot_sections():
             shot_id_str = str(section.shot_id)
@@ -319,12 +338,16 @@ class NewsScript:
 
     def _generate_headline(self):
         """Generates a headline for the news script."""
-        headline = run_chain(headline_chain, {"SCRIPT": self.text_script, "ORIGINAL_HEADLINE": self.dataloader.get_story_title()})
-        while len(headline) >= 45:
-            if self.error_handler:
-                self.error_handler.info(f"Headline was too long, shortening: {headline}")
-            headline = run_chain(headline_chain, {"SCRIPT": self.text_script + f"\n\nOld headline was '{headline}'. This is too long.", "ORIGINAL_HEADLINE": self.dataloader.get_story_title()})
-        return headline
+        script = self.text_script
+        while True:
+            try:
+                # Generation stops as soon as the headline reaches 45 characters
+                return run_chain(headline_chain, {"SCRIPT": script, "ORIGINAL_HEADLINE": self.dataloader.get_story_title()}, validators=(MaxLength(45),))
+            except ResponseValidationError as e:
+                headline = e.partial_response
+                if self.error_handler:
+                    self.error_handler.info(f"Headline was too long, shortening: {headline}")
+                script = self.text_script + f"\n\nOld headline was '{headline}'. This is too long."
     
     def get_total_read_time_seconds(self):
         """Returns the total read time of the text script."""
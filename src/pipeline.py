@@ -0,0 +1,88 @@
+# Pipeline
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import threading
+import time
+
+def with_script_run_context(function: Callable) -> Callable:
+    """Lets function write to the Streamlit page from a worker thread when running in the app."""
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    except ImportError:
+        return function
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return function
+
+    def run_with_context(*args, **kwargs):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return function(*args, **kwargs)
+    return run_with_context
+
+@dataclass
+class Step:
+    name: str
+    function: Callable[[], Any]
+    depends_on: List[str] = field(default_factory=list)
+
+class Pipeline:
+    """Runs steps on a thread pool as soon as the steps they depend on have finished.
+
+    Independent LLM calls overlap, so a run takes about as long as its slowest chain of
+    dependent steps rather than the sum of all of them. Per-provider request limits are
+    enforced by the shared limiters in src.request_scheduler, not here.
+    """
+
+    def __init__(self, max_workers: int = 8, error_handler = None):
+        self.steps: Dict[str, Step] = {}
+        self.max_workers = max_workers
+        self.error_handler = error_handler
+        self.durations: Dict[str, float] = {}
+        self.results: Dict[str, Any] = {}
+
+    def add(self, name: str, function: Callable[[], Any], depends_on: Optional[List[str]] = None) -> "Pipeline":
+        depends_on = depends_on or []
+        for dependency in depends_on:
+            if dependency not in self.steps:
+                raise ValueError(f"Step {name} depends on unknown step {dependency}")
+        self.steps[name] = Step(name, function, depends_on)
+        return self
+
+    def run(self) -> Dict[str, Any]:
+        """Runs every step, returning their results by name. The first failing step's error is raised.
+
+        Steps can read the results of the steps they depend on from self.results.
+        """
+        run_step = with_script_run_context(self._timed)
+        results = self.results
+        running: Dict[Future, str] = {}
+        remaining = dict(self.steps)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline") as executor:
+            while remaining or running:
+                for name, step in list(remaining.items()):
+                    if all(dependency in results for dependency in step.depends_on):
+                        running[executor.submit(run_step, step)] = name
+                        del remaining[name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        for pending in running:
+                            pending.cancel()
+                        if self.error_handler:
+                            self.error_handler.error(f"ERROR: Pipeline step {name} failed")
+                        raise
+        return results
+
+    def _timed(self, step: Step):
+        start_time = time.monotonic()
+        result = step.function()
+        self.durations[step.name] = time.monotonic() - start_time
+        print(f"Finished {step.name} in {self.durations[step.name]:.1f}s")
+        return result
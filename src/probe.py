@@ -0,0 +1,132 @@
+# Probe
+
+# STREAMLIT
+from src.ffmpeg import get_ffprobe_binary
+# /STREAMLIT
+
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import subprocess
+import threading
+import json
+
+PROBE_INDEX_FILE = "probe_index.json"
+
+@dataclass
+class MediaInfo:
+    """Stream metadata of a media file, as reported by ffprobe."""
+
+    duration: float
+    fps: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    video_codec: Optional[str] = None
+    has_audio: bool = False
+    audio_codec: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return (self.width, self.height)
+
+def parse_frame_rate(rate: Optional[str]) -> Optional[float]:
+    """Parses an ffprobe rate like '30000/1001'."""
+    if not rate or rate == "0/0":
+        return None
+    numerator, _, denominator = rate.partition("/")
+    return float(numerator) / float(denominator or 1)
+
+def run_ffprobe(file: Path) -> MediaInfo:
+    """Reads container and stream headers with ffprobe, without decoding any frames."""
+    command = [get_ffprobe_binary(), "-v", "error", "-print_format", "json", "-show_format", "-show_streams", str(file)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on {file}: {result.stderr}")
+    data = json.loads(result.stdout)
+
+    streams = data.get("streams", [])
+    video = next((stream for stream in streams if stream.get("codec_type") == "video"), None)
+    audio = next((stream for stream in streams if stream.get("codec_type") == "audio"), None)
+
+    duration = data.get("format", {}).get("duration")
+    if duration is None:
+        duration = max([float(stream["duration"]) for stream in streams if "duration" in stream], default=0.0)
+
+    info = MediaInfo(duration=float(duration))
+    if video:
+        info.fps = parse_frame_rate(video.get("avg_frame_rate")) or parse_frame_rate(video.get("r_frame_rate"))
+        info.width = video.get("width")
+        info.height = video.get("height")
+        info.video_codec = video.get("codec_name")
+    if audio:
+        info.has_audio = True
+        info.audio_codec = audio.get("codec_name")
+        info.sample_rate = int(audio["sample_rate"]) if "sample_rate" in audio else None
+        info.channels = audio.get("channels")
+    return info
+
+class ProbeIndex:
+    """Probe results memoized by path, modification time and size.
+
+    With a folder the results are also kept in a JSON index there, so later runs on the
+    same story don't probe again.
+    """
+
+    def __init__(self, folder: Optional[Path] = None):
+        self.index_file = folder / PROBE_INDEX_FILE if folder else None
+        self.entries: Optional[Dict[str, Dict]] = None
+        self.lock = threading.Lock()
+
+    def load(self) -> Dict[str, Dict]:
+        if self.entries is None:
+            self.entries = {}
+            if self.index_file and self.index_file.exists():
+                try:
+                    with open(self.index_file, "r") as f:
+                        self.entries = json.load(f)
+                except json.JSONDecodeError:
+                    self.entries = {}
+        return self.entries
+
+    def save(self):
+        if not self.index_file:
+            return
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.index_file.with_suffix(".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(self.entries, f)
+        tmp_file.replace(self.index_file)
+
+    def probe(self, file: Path) -> MediaInfo:
+        file = Path(file)
+        stat = file.stat()
+        key = str(file.resolve())
+        with self.lock:
+            entry = self.load().get(key)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                return MediaInfo(**entry["info"])
+
+        info = run_ffprobe(file)
+
+        with self.lock:
+            self.load()[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "info": asdict(info)}
+            self.save()
+        return info
+
+_indexes: Dict[Optional[Path], ProbeIndex] = {}
+_indexes_lock = threading.Lock()
+
+def probe_media(file: Path, index_folder: Optional[Path] = None) -> MediaInfo:
+    """Returns the duration, fps, dimensions, codecs and audio info of a media file.
+
+    index_folder (usually the story folder) persists the results to disk, otherwise they
+    are only memoized for this process.
+    """
+    index_folder = Path(index_folder).resolve() if index_folder else None
+    with _indexes_lock:
+        if index_folder not in _indexes:
+            _indexes[index_folder] = ProbeIndex(index_folder)
+        index = _indexes[index_folder]
+    return index.probe(file)
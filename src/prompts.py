@@ -936,6 +936,31 @@ The transcript from a clip should match the quote from a sot to match. If a clip
 Ensure properly formatted JSON. Put your response in <response></response> tags."""
 )
 
+translate_transcripts_prompt = PromptTemplate.from_template(
+"""Translate the transcripts of these video clips to English:
+
+<clips>
+{TRANSCRIPTS}
+</clips>
+
+Translate each clip's transcript faithfully, keeping the speaker's meaning and tone. Don't summarize or leave anything out.
+
+Return a JSON in a format like:
+<example>
+{{
+   "translations": [
+      {{
+         "clip_id": "<clip_id>",
+         "english_text": "<translation>"
+      }},
+      ...
+   ]
+}}
+</example>
+
+Include every clip. Ensure properly formatted JSON. Put your response in <response></response> tags."""
+)
+
 tts_prompt = PromptTemplate.from_template(
 """Here is some text that will be spoken aloud on television:
 
@@ -1417,14 +1442,16 @@ match_sot_chain = (match_sot_prompt | sonnet35).with_config({"run_name": "match_
 match_hard_sot_chain = (match_hard_sot_prompt | sonnet35).with_config({"run_name": "match_hard_sot"})
 language_to_iso_chain = (language_to_iso_prompt | sonnet35).with_config({"run_name": "language_to_iso"})
 match_clip_to_sots_chain = (match_clip_to_sots_prompt | sonnet35).with_config({"run_name": "match_clip_to_sots"})
+translate_transcripts_chain = (translate_transcripts_prompt | sonnet35).with_config({"run_name": "translate_transcripts"})
 json_chain = (json_prompt | sonnet35).with_config({"run_name": "json"})
 courtesy_chain = (courtesy_prompt | sonnet35).with_config({"run_name": "courtesy"})
 extract_storyline_and_shotlist_chain = (extract_storyline_and_shotlist_prompt | sonnet35).with_config({"run_name": "extract_storyline_and_shotlist"})
 
-from sqlalchemy.exc import OperationalError
-import time
-from anthropic import APIError
+from dataclasses import dataclass
 from src.hashing import hash_chain
+from src.llm_cache import llm_cache, chain_cache_key
+from src.request_scheduler import get_limiter
+from src.json_repair import parse_json
 from langchain_core.runnables.base import RunnableBinding
 
 def extract_response(text):
@@ -1439,46 +1466,151 @@ def extract_response(text):
 def extract_xml(text):
     return XMLOutputParser().invoke(extract_response(text).replace("&", "and"))
 
+def parse_response(response_raw):
+    response_xml = extract_xml(response_raw)
+    if type(response_xml['response']) is str:
+        return response_xml['response'].strip()
+    else:
+        return response_xml['response']
+
+class ResponseValidationError(ValueError):
+    """Raised when a streamed response fails a validator, with the text generated so far."""
+
+    def __init__(self, message, partial_response):
+        super().__init__(message)
+        self.partial_response = partial_response
+
+@dataclass(frozen=True)
+class MaxLength:
+    """Fails once the response is limit characters or longer."""
+    limit: int
+
+    def check(self, response: str, complete: bool) -> bool:
+        return len(response.strip()) < self.limit
+
+@dataclass(frozen=True)
+class StartsWith:
+    """Fails as soon as the response can't start with prefix, e.g. "{" for JSON."""
+    prefix: str
+
+    def check(self, response: str, complete: bool) -> bool:
+        response = response.lstrip()
+        if len(response) < len(self.prefix):
+            return not complete and self.prefix.startswith(response)
+        return response.startswith(self.prefix)
+
+def partial_response_body(text):
+    """The text inside <response> so far, without a partly streamed closing tag."""
+    body = text[text.rfind("<response>") + len("<response>"):]
+    for i in range(1, len("</response>")):
+        if body.endswith("</response>"[:i]):
+            return body[:-i]
+    return body
+
+def check_response(run_name, response_raw, validators):
+    """Checks a complete response against validators, as stream_chain does while streaming."""
+    if not validators:
+        return
+    body = ""
+    if "<response>" in response_raw:
+        end = response_raw.rfind("</response>")
+        body = partial_response_body(response_raw[:end] if end > response_raw.rfind("<response>") else response_raw)
+    for validator in validators:
+        if not validator.check(body, True):
+            raise ResponseValidationError(f"{run_name} response failed {validator}", body.strip())
+
+def stream_chain(chain, params, validators=()):
+    """Streams a chain's response, stopping as soon as </response> arrives.
+
+    Validators are checked on the response body as it streams, so a generation that is going
+    wrong is abandoned without paying for the rest of it. Returns the text and stop reason.
+    """
+    run_name = chain.config.get('run_name')
+    message = None
+    text = ""
+    stream = chain.stream(params)
+    try:
+        for chunk in stream:
+            message = chunk if message is None else message + chunk
+            text += chunk.content if isinstance(chunk.content, str) else "".join(part.get("text", "") for part in chunk.content if isinstance(part, dict))
+            if "<response>" not in text:
+                continue
+            complete = "</response>" in text[text.rfind("<response>"):]
+            body = partial_response_body(text[:text.rfind("</response>")] if complete else text)
+            for validator in validators:
+                if not validator.check(body, complete):
+                    raise ResponseValidationError(f"{run_name} response failed {validator}", body.strip())
+            if complete:
+                # Anything after the response block is never used
+                return text, "end_turn"
+    finally:
+        stream.close()
+    return text, message.response_metadata.get("stop_reason") if message is not None else None
+
 @st.cache_data(show_spinner=False, hash_funcs={RunnableBinding: hash_chain})
-def run_chain(chain, params, max_retries=3, retry_delay=5):
-    """Runs the LangChain chain with retry logic."""
-    retries = 0
-    while retries <= max_retries:
-        try:
-            response = chain.invoke(params)
-            response_stop_reason = response.response_metadata.get("stop_reason")
-            if response_stop_reason != "end_turn":
-                print(f"DEBUG: {chain.config.get('run_name')} response_stop_reason: {response_stop_reason}")
-            response_raw = response.content
-            print(f"DEBUG: {chain.config.get('run_name')} response_raw: {response_raw}")
-            response_xml = extract_xml(response_raw)
-            if type(response_xml['response']) is str:
-                return response_xml['response'].strip()
-            else:
-                return response_xml['response']
-        except OperationalError:
-            response_raw = chain.invoke(params).content
-            response_xml = extract_xml(response_raw)
-            if type(response_xml['response']) is str:
-                return response_xml['response'].strip()
-            else:
-                return response_xml['response']
-        except APIError as e: 
-            if e.status_code == 529 and retries < max_retries: 
-                print(f"Server overloaded, retrying in {retry_delay} seconds...")
-                retries += 1
-                time.sleep(retry_delay)
-            elif retries < max_retries:
-                retries += 1
-                time.sleep(retry_delay)
-            else:
-                raise e  # Re-raise if retries exceeded
+def run_chain(chain, params, cache=True, stream=True, validators=()):
+    """Runs the LangChain chain, reusing stored responses from identical calls.
+
+    Transient errors (overload, server and database errors) are retried by the shared Anthropic
+    limiter. With stream, the response is consumed as it is generated and parsed as soon as its
+    <response> block closes. Validators (e.g. MaxLength, StartsWith) are checked while
+    streaming and raise ResponseValidationError early; cached and non-streamed responses are
+    checked once complete, and only responses that pass are stored.
+    """
+    run_name = chain.config.get('run_name')
+    cache_key = chain_cache_key(chain, params) if cache else None
+    if cache:
+        response_raw = llm_cache.get(cache_key)
+        if response_raw is not None:
+            print(f"DEBUG: {run_name} cached response")
+            check_response(run_name, response_raw, validators)
+            return parse_response(response_raw)
+
+    if stream:
+        response_raw, response_stop_reason = get_limiter("anthropic").call(stream_chain, chain, params, validators)
+    else:
+        response = get_limiter("anthropic").call(chain.invoke, params)
+        response_stop_reason = response.response_metadata.get("stop_reason")
+        response_raw = response.content
+    if response_stop_reason != "end_turn":
+        print(f"DEBUG: {run_name} response_stop_reason: {response_stop_reason}")
+    print(f"DEBUG: {run_name} response_raw: {response_raw}")
+    if not stream:
+        check_response(run_name, response_raw, validators)
+    result = parse_response(response_raw)
+    # Truncated responses aren't stored, so they're retried next time
+    if cache and response_stop_reason == "end_turn":
+        llm_cache.put(cache_key, response_raw, run_name)
+    return result
+
+def run_chain_structured(chain, params, schema):
+    """Runs a chain's prompt with the model's answer constrained to a pydantic schema through tool use."""
+    sequence = chain.bound
+    structured_chain = (sequence.first | sequence.last.with_structured_output(schema)).with_config({"run_name": f"{chain.config.get('run_name')}_structured"})
+    return get_limiter("anthropic").call(structured_chain.invoke, params).model_dump()
 
 @st.cache_data(show_spinner=False, hash_funcs={RunnableBinding: hash_chain})
-def run_chain_json(chain, params):
+def run_chain_json(chain, params, _schema=None, structured=False):
+    """Runs a chain that answers in JSON.
+
+    Invalid JSON is repaired locally first. Only if that fails, or the result doesn't match
+    _schema, is another LLM call made: a structured-output call when there is a schema,
+    otherwise the json_chain repair. With structured, the structured-output call is used directly.
+    """
+    if structured and _schema is not None:
+        return run_chain_structured(chain, params, _schema)
+
     response = run_chain(chain, params)
-    try:
-        return JsonOutputParser().invoke(response)
-    except Exception as e:
-        response = run_chain(json_chain, {"JSON": response})
-        return JsonOutputParser().invoke(response)
+    for parse in (JsonOutputParser().invoke, parse_json):
+        try:
+            data = parse(response)
+            if _schema is not None:
+                _schema.model_validate(data)
+            return data
+        except Exception as e:
+            print(f"DEBUG: {chain.config.get('run_name')} JSON not usable: {e}")
+
+    if _schema is not None:
+        return run_chain_structured(chain, params, _schema)
+    response = run_chain(json_chain, {"JSON": response})
+    return JsonOutputParser().invoke(response)
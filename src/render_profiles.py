@@ -0,0 +1,93 @@
+# RenderProfiles
+
+# STREAMLIT
+from src.clip_manager import ClipReaderPool
+# /STREAMLIT
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import copy
+
+@dataclass(frozen=True)
+class RenderProfile:
+    """Resolution and libx264 settings for one tier of rendering.
+
+    Software x264 with a fixed preset gives the same output on every machine. Quality is
+    either constant (crf) or targeted at a bitrate for delivery.
+    """
+
+    name: str
+    resolution: Tuple[int, int]
+    preset: str = "medium"
+    crf: Optional[int] = None
+    bitrate: Optional[str] = None
+    audio_bitrate: Optional[str] = None
+
+    def codec_options(self) -> List[str]:
+        """FFmpeg output options for the video and audio codecs."""
+        options = ["-c:v", "libx264", "-preset", self.preset]
+        if self.crf is not None:
+            options += ["-crf", str(self.crf)]
+        else:
+            options += ["-b:v", self.bitrate]
+        options += ["-c:a", "aac"]
+        if self.audio_bitrate:
+            options += ["-b:a", self.audio_bitrate]
+        return options
+
+    def moviepy_options(self) -> Dict:
+        """Keyword arguments for moviepy's write_videofile."""
+        return {
+            "codec": "libx264",
+            "preset": self.preset,
+            "bitrate": self.bitrate if self.crf is None else None,
+            "audio_bitrate": self.audio_bitrate,
+            "ffmpeg_params": ["-crf", str(self.crf)] if self.crf is not None else None,
+        }
+
+RENDER_PROFILES = {
+    "draft": RenderProfile("draft", (640, 360), preset="ultrafast", crf=30, audio_bitrate="96k"),
+    "review": RenderProfile("review", (1280, 720), preset="veryfast", crf=23, audio_bitrate="128k"),
+    "broadcast": RenderProfile("broadcast", (1920, 1080), preset="slow", bitrate="10M", audio_bitrate="192k"),
+}
+
+def get_render_profile(profile: Union[str, RenderProfile]) -> RenderProfile:
+    """Looks up a render profile by name."""
+    if isinstance(profile, RenderProfile):
+        return profile
+    if profile not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile: {profile}, expected one of {list(RENDER_PROFILES)}")
+    return RENDER_PROFILES[profile]
+
+# Final renders are queued one at a time so they don't compete with interactive previews
+_render_queue = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+
+def queue_render(video_editor, output_file: Path) -> Future:
+    """Queues a render in the background, returning a Future that resolves to the output file.
+
+    The script is copied so later edits don't change a render that is already queued. The
+    render outlives the script run that queued it, so it reports nothing to the page; callers
+    poll the Future for its status.
+    The video is written to a temporary file and moved into place once complete.
+    """
+    video_editor = copy.copy(video_editor)
+    news_script = copy.copy(video_editor.news_script)
+    # Sections are copied, the clips, readers and handlers they point to are shared
+    news_script.sections = [copy.copy(section) for section in news_script.sections]
+    for section in news_script.sections:
+        if hasattr(section, "brolls"):
+            section.brolls = copy.deepcopy(section.brolls)
+    video_editor.news_script = news_script
+    # Pooled readers aren't thread safe, the background render gets its own
+    video_editor.clip_manager = copy.copy(video_editor.clip_manager)
+    video_editor.clip_manager.reader_pool = ClipReaderPool()
+
+    def render() -> Path:
+        tmp_file = output_file.with_name(f"{output_file.stem}_tmp{output_file.suffix}")
+        video_editor.assemble_video(output_file=tmp_file)
+        tmp_file.replace(output_file)
+        return output_file
+
+    return _render_queue.submit(render)
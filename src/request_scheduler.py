@@ -0,0 +1,135 @@
+# RequestScheduler
+
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+import threading
+import random
+import time
+import os
+
+import httpx
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+# Per-provider concurrency limits, overridable with e.g. DEEPGRAM_MAX_CONCURRENCY=20
+DEFAULT_MAX_CONCURRENCY = {
+    "deepgram": 16,
+    "openai": 8,
+    "anthropic": 8,
+}
+
+def get_status_code(error: Exception) -> Optional[int]:
+    """HTTP status of an API error from httpx, OpenAI or Deepgram, if it has one."""
+    response = getattr(error, "response", None)
+    for status in (getattr(error, "status_code", None), getattr(error, "status", None), getattr(response, "status_code", None)):
+        try:
+            return int(status)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, in either its seconds or HTTP date form."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    value = headers.get("retry-after") if headers else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and network failures are retried, other client errors aren't."""
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    if isinstance(error, (ValueError, TypeError, KeyError, AttributeError)):
+        return False
+    status_code = get_status_code(error)
+    return status_code is None or status_code in RETRYABLE_STATUS_CODES
+
+class AdaptiveLimiter:
+    """Concurrency limit for one API provider, adjusted additive-increase/multiplicative-decrease.
+
+    Every successful response raises the limit by about one request per round of requests, up to
+    max_concurrency. Rate limits and server errors halve it, so the limit settles just below what
+    the provider can take. Latency isn't used: it grows with the size of the request (a master
+    against a short clip, a long edit against a spell check), not only with load.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, min_concurrency: int = 1, initial_concurrency: Optional[int] = None,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(initial_concurrency or max(min_concurrency, max_concurrency // 4))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def on_overload(self):
+        with self._condition:
+            self.limit = max(self.min_concurrency, self.limit / 2)
+
+    def backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Full jitter exponential backoff, never shorter than the provider's Retry-After."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def call(self, function: Callable, *args, **kwargs):
+        """Calls function within the limit, retrying transient failures."""
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                self.release()
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                self.on_overload()
+                delay = self.backoff_delay(attempt, e)
+                print(f"{self.name} request failed ({e}). Retrying in {delay:.1f} seconds with concurrency {int(self.limit)}...")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.release()
+            self.on_success()
+            return result
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(provider: str) -> AdaptiveLimiter:
+    """Returns the limiter shared by every request to a provider in this process."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            max_concurrency = int(os.environ.get(f"{provider.upper()}_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY.get(provider, 4)))
+            _limiters[provider] = AdaptiveLimiter(provider, max_concurrency)
+        return _limiters[provider]
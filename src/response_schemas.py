@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional, Union
+
+# Shapes of the JSON responses of the chains run with run_chain_json
+
+class ScriptSectionResponse(BaseModel):
+    id: int
+    text: str
+    type: Literal["SOT", "ANCHOR"]
+    shot_id: Optional[int] = None
+    quote: Optional[str] = None
+
+class ParsedScriptResponse(BaseModel):
+    sections: List[ScriptSectionResponse]
+
+class LoglineResponse(BaseModel):
+    id: int
+    logline: str
+
+class LoglinesResponse(BaseModel):
+    sections: List[LoglineResponse]
+
+class SotMatchResponse(BaseModel):
+    clip_id: Union[str, int]
+    sot_id: Optional[int] = None
+
+class SotMatchesResponse(BaseModel):
+    matches: List[SotMatchResponse]
+
+class BrollPlacementResponse(BaseModel):
+    id: Union[str, int]
+    start: float
+    end: float
+
+class SectionBrollsResponse(BaseModel):
+    id: int
+    brolls: List[BrollPlacementResponse]
+
+class BrollPlacementsResponse(BaseModel):
+    sections: List[SectionBrollsResponse]
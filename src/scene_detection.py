@@ -0,0 +1,163 @@
+# SceneDetection
+
+# STREAMLIT
+from src.ffmpeg import get_ffmpeg_binary
+from src.probe import probe_media
+# /STREAMLIT
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+import multiprocessing
+import subprocess
+import copy
+import os
+
+import numpy as np
+
+# Same minimum width scenedetect's auto downscale targets
+DETECTION_MIN_WIDTH = 256
+# Videos shorter than this many seconds per worker are detected in one pass
+MIN_CHUNK_SECONDS = 60
+
+def detection_size(width: int, height: int, downscale: Optional[int] = None) -> Tuple[int, int]:
+    """Returns the frame size detectors see, using scenedetect's auto downscale factor by default."""
+    if downscale is None:
+        downscale = max(width // DETECTION_MIN_WIDTH, 1)
+    return (round(width / downscale), round(height / downscale))
+
+def decode_frames(video_file: Path, size: Tuple[int, int], start_frame: int = 0, num_frames: Optional[int] = None,
+                  fps: Optional[float] = None, frame_skip: int = 0, threads: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yields (frame number, BGR frame) pairs decoded and downscaled by FFmpeg.
+
+    FFmpeg decodes with all cores and scales before the frames are copied into Python, so
+    detectors only ever touch small frames. With frame_skip, only every (frame_skip + 1)th
+    frame is yielded; num_frames is the length of the range in source frames.
+    """
+    width, height = size
+    command = [get_ffmpeg_binary(), "-v", "error", "-nostdin", "-threads", str(threads or os.cpu_count() or 1)]
+    if start_frame:
+        command += ["-ss", f"{start_frame / fps:.6f}"]
+    command += ["-i", str(video_file), "-an", "-sn"]
+    if num_frames is not None:
+        # -frames:v counts frames after the select filter, one in (frame_skip + 1) of the range
+        command += ["-frames:v", str(-(-num_frames // (frame_skip + 1)))]
+
+    filters = []
+    if frame_skip:
+        filters.append(f"select=not(mod(n\\,{frame_skip + 1}))")
+    filters.append(f"scale={width}:{height}:flags=bilinear")
+    command += ["-vf", ",".join(filters), "-fps_mode", "passthrough", "-pix_fmt", "bgr24", "-f", "rawvideo", "-"]
+
+    frame_bytes = width * height * 3
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=frame_bytes * 4) as process:
+        i = 0
+        while True:
+            data = process.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            yield start_frame + i * (frame_skip + 1), np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+            i += 1
+        process.stdout.close()
+
+def frame_difference(previous: np.ndarray, current: np.ndarray) -> float:
+    """Mean change in hue, saturation and luma between two frames, like ContentDetector's default score."""
+    import cv2
+    previous = cv2.cvtColor(previous, cv2.COLOR_BGR2HSV).astype(np.int16)
+    current = cv2.cvtColor(current, cv2.COLOR_BGR2HSV).astype(np.int16)
+    return float(np.abs(current - previous).mean())
+
+def refine_cut(video_file: Path, cut: int, frame_skip: int, fps: float, size: Tuple[int, int]) -> int:
+    """Finds the exact frame of a cut that was detected on frame-subsampled input.
+
+    The cut lies between the previous sampled frame and the detected one, the frame with
+    the largest change from its predecessor in that window is the first frame of the new scene.
+    """
+    first_frame = max(cut - frame_skip - 1, 0)
+    frames = [frame for _, frame in decode_frames(video_file, size, start_frame=first_frame, num_frames=cut - first_frame + 1, fps=fps)]
+    if len(frames) < 2:
+        return cut
+    differences = [frame_difference(previous, current) for previous, current in zip(frames, frames[1:])]
+    return first_frame + 1 + int(np.argmax(differences))
+
+def detect_cuts(video_file: Path, detector, fps: float, size: Tuple[int, int], start_frame: int = 0,
+                num_frames: Optional[int] = None, frame_skip: int = 0, threads: Optional[int] = None) -> Tuple[List[int], int]:
+    """Runs a scenedetect detector over the downscaled frames, returning the cut frames and the last frame number."""
+    cuts = []
+    last_frame = start_frame - 1
+    for frame_num, frame in decode_frames(video_file, size, start_frame, num_frames, fps, frame_skip, threads):
+        cuts += detector.process_frame(frame_num, frame)
+        last_frame = frame_num
+    cuts += detector.post_process(last_frame)
+    if frame_skip:
+        cuts = [refine_cut(video_file, cut, frame_skip, fps, size) for cut in cuts]
+    return sorted(set(cuts)), last_frame
+
+def detect_cuts_parallel(video_file: Path, detector, fps: float, size: Tuple[int, int], total_frames: int,
+                         workers: int, frame_skip: int = 0) -> Tuple[List[int], int]:
+    """Detects cuts in overlapping chunks of the video on a process pool and merges them.
+
+    Each chunk starts early enough for the detector to warm up (its rolling window and minimum
+    scene length) and ends late enough to decide on its last frames. Only cuts inside a chunk's
+    own range are kept, and cuts closer than min_scene_len across chunk boundaries are dropped.
+    """
+    step = frame_skip + 1
+    window_width = getattr(detector, "window_width", 2)
+    min_scene_len = int(getattr(detector, "min_scene_len", 0))
+    warmup = (max(min_scene_len, 2 * window_width + 1) + 1) * step
+    lookahead = (window_width + 1) * step
+
+    # Chunk boundaries on the frame skip grid, so every chunk samples the same frames as one pass would
+    chunk_frames = -(-total_frames // workers // step) * step
+    boundaries = [(start, min(start + chunk_frames, total_frames)) for start in range(0, total_frames, chunk_frames)]
+    threads = max(1, (os.cpu_count() or 1) // len(boundaries))
+
+    # Spawned rather than forked, the caller usually has other threads (Streamlit, the story pipeline)
+    with ProcessPoolExecutor(max_workers=len(boundaries), mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = []
+        for start, end in boundaries:
+            decode_start = max(start - warmup, 0)
+            decode_end = min(end + lookahead, total_frames)
+            futures.append(executor.submit(detect_cuts, video_file, copy.deepcopy(detector), fps, size,
+                                           decode_start, decode_end - decode_start, frame_skip, threads))
+
+        cuts = []
+        last_frame = -1
+        for (start, end), future in zip(boundaries, futures):
+            chunk_cuts, chunk_last_frame = future.result()
+            cuts += [cut for cut in chunk_cuts if start <= cut < end]
+            last_frame = max(last_frame, chunk_last_frame)
+
+    merged = []
+    for cut in sorted(cuts):
+        if not merged or cut - merged[-1] >= min_scene_len:
+            merged.append(cut)
+    return merged, last_frame
+
+def detect_scenes(video_file: Path, detector, downscale: Optional[int] = None, frame_skip: int = 0,
+                  index_folder: Optional[Path] = None, workers: Optional[int] = None):
+    """Drop-in replacement for scenedetect.detect that decodes a downscaled proxy stream with FFmpeg.
+
+    Long videos are split into chunks that are detected in parallel, one process per core by default.
+    Returns the same (start, end) FrameTimecode scene list, which is empty when there are no cuts.
+    """
+    from scenedetect import FrameTimecode
+    from scenedetect.scene_manager import get_scenes_from_cuts
+
+    info = probe_media(video_file, index_folder=index_folder)
+    size = detection_size(info.width, info.height, downscale)
+
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, int(info.duration // MIN_CHUNK_SECONDS))
+    if workers > 1:
+        cuts, last_frame = detect_cuts_parallel(video_file, detector, info.fps, size, int(round(info.duration * info.fps)), workers, frame_skip)
+    else:
+        cuts, last_frame = detect_cuts(video_file, detector, info.fps, size, frame_skip=frame_skip)
+    if not cuts:
+        return []
+
+    end_frame = last_frame + 1
+    if frame_skip:
+        # The last sampled frame can be up to frame_skip frames before the end
+        end_frame = max(end_frame, int(round(info.duration * info.fps)))
+    return get_scenes_from_cuts([FrameTimecode(cut, info.fps) for cut in cuts], FrameTimecode(0, info.fps), FrameTimecode(end_frame, info.fps))
@@ -309,6 +309,14 @@ class StoryBlueprinter:
         return Track(clips=[clip])
 
     def _create_anchor_clip(self, broll_info: Dict, section: AnchorScriptSection) -> Clip:
+        if section.anchor_video_file is None and section.anchor_image_file is not None:
+            url = self.gcs.upload_to_gcs_url(section.anchor_image_file, bucket_name="public-heygen-assets")
+            return Clip(
+                asset=ImageAsset(type="image", src=str(url)),
+                start=broll_info['start'],
+                length=broll_info['end'] - broll_info['start'],
+                fit=FitOption.CROP
+            )
         url = self.gcs.upload_to_gcs_url(section.anchor_video_file, bucket_name="public-heygen-assets")
         asset = VideoAsset(
             type="video",
@@ -4,14 +4,15 @@
 from src.constants import OPENAI_API_KEY, DEEPGRAM_API_KEY
 from src.language import Language
 from src.hashing import sha256sum, hash_audio_file
+from src.request_scheduler import get_limiter
+from src.transcription_cache import transcription_cache
 import streamlit as st
 # /STREAMLIT
 
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
 from pathlib import Path, PosixPath
-import time
-import traceback
+import json
 
 from openai import OpenAI
 
@@ -37,6 +38,55 @@ class Word:
         else:
             return self.end - 2.0
 
+SENTENCE_ENDINGS = (".", "?", "!")
+
+@dataclass
+class Transcript:
+    """Word timings of a whole file, transcribed once and shared by the clips cut from it."""
+
+    words: List[Word]
+    confidence: float
+    language: Optional[str]
+
+    @classmethod
+    def from_file(cls, file: Path):
+        def transcribe():
+            transcription, language = deepgram_transcribe_with_retry(file, model="nova-2")
+            if not transcription.transcript:
+                transcription, language = deepgram_transcribe_with_retry(file, model="whisper-large")
+            words = [Word(word.punctuated_word, word.start, word.end) for word in transcription.words]
+            return asdict(cls(words, transcription.confidence, language))
+
+        return cls.from_dict(transcription_cache.get_or_create(file, "transcript", transcribe))
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        return cls([Word(**word) for word in data["words"]], data["confidence"], data["language"])
+
+    @classmethod
+    def load(cls, file: Path):
+        with open(file, "r") as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, file: Path):
+        with open(file, "w") as f:
+            json.dump(asdict(self), f)
+
+    def splits_sentence(self, time: float, max_gap: float = 0.75) -> bool:
+        """Whether a cut at time falls inside a word, or between two words of the same sentence."""
+        before = [word for word in self.words if word.start < time]
+        after = [word for word in self.words if word.start >= time]
+        if before and before[-1].end > time:
+            return True
+        if not before or not after:
+            return False
+        return not before[-1].word.endswith(SENTENCE_ENDINGS) and after[0].start - before[-1].end <= max_gap
+
+    def words_between(self, start: float, end: float) -> List[Word]:
+        """Words centred inside a time range, with timings relative to its start."""
+        return [Word(word.word, word.start - start, word.end - start) for word in self.words
+                if start <= (word.start + word.end) / 2 < end]
+
 @dataclass
 class WhisperResults:
     """Represents the results of Whisper speech recognition on an audio file."""
@@ -46,20 +96,44 @@ class WhisperResults:
     no_speech_prob: float
     has_speech: bool
     language: Language
-    english_text: str
+    english_text: Optional[str]
+
+    @property
+    def needs_translation(self) -> bool:
+        """Whether the results are waiting for their English translation."""
+        return self.english_text is None
 
     @classmethod
-    def from_file(cls, file: Path):
+    def from_file(cls, file: Path, translate: bool = True):
         """
         Performs speech recognition on an audio file using OpenAI's Whisper API.
 
         Args:
             file: The audio file to transcribe.
+            translate: Whether to translate non-English speech from the audio now. Otherwise
+                english_text is left as None for a batch text translation.
 
         Returns:
             A WhisperResults object containing the transcription data.
         """
-        transcription, language = deepgram_transcribe(file, model="nova-2")
+        results = cls.from_dict(transcription_cache.get_or_create(file, "whisper", lambda: asdict(cls._from_file(file))))
+        if translate and results.needs_translation:
+            results.english_text = openai_translate(file.resolve())
+        return results
+
+    @classmethod
+    def no_speech(cls):
+        """Results for audio that voice activity detection found no speech in."""
+        return cls("", [], 1.0, False, Language("Unknown", "Unknown"), "")
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        return cls(data["text"], [Word(**word) for word in data["timestamps"]], data["no_speech_prob"],
+                   data["has_speech"], Language(**data["language"]), data["english_text"])
+
+    @classmethod
+    def _from_file(cls, file: Path):
+        transcription, language = deepgram_transcribe_with_retry(file, model="nova-2")
 
         if not transcription.transcript:
             transcription, language = deepgram_transcribe_with_retry(file, model="whisper-large")
@@ -72,23 +146,53 @@ class WhisperResults:
 
         has_speech = bool(text)
 
-        if not language:
-            english_text = text
-        elif language == Language.from_str("english"):
+        # Non-English speech is translated separately, from the audio or in a batch from the text
+        english_text = text if not has_speech or language == Language.from_str("english") else None
+
+        return cls(text, timestamps, min_no_speech_prob, has_speech, language, english_text)
+
+    @classmethod
+    def from_transcript(cls, transcript: Transcript, start: float, end: float, get_audio_file: Callable[[], Path], translate: bool = True):
+        """
+        Builds the results for a time range of a file from its full transcript, without another API call.
+
+        Args:
+            transcript: The transcript of the whole file.
+            start: Start of the range in seconds.
+            end: End of the range in seconds.
+            get_audio_file: Returns the range's audio, only called when its speech needs translating.
+            translate: Whether to translate non-English speech from the audio now, as in from_file.
+
+        Returns:
+            A WhisperResults object with timestamps relative to the start of the range.
+        """
+        timestamps = transcript.words_between(start, end)
+        text = " ".join(word.word for word in timestamps)
+        has_speech = bool(text)
+        no_speech_prob = 1.0 - transcript.confidence if has_speech else 1.0
+        language = Language.from_str(transcript.language) if transcript.language else Language("Unknown", "Unknown")
+
+        if not has_speech or language == Language.from_str("english"):
             english_text = text
+        elif translate:
+            english_text = openai_translate(get_audio_file().resolve())
         else:
-            english_text = openai_translate(file.resolve())
+            english_text = None
 
-        return cls(text, timestamps, min_no_speech_prob, has_speech, language, english_text)
+        return cls(text, timestamps, no_speech_prob, has_speech, language, english_text)
 
 @st.cache_data(show_spinner=False, hash_funcs={PosixPath: hash_audio_file})
 def openai_translate(abs_file_path: Path):
-    translation = openai_client.audio.translations.create(
-        file=abs_file_path,
-        model="whisper-1",
-        response_format="json",
-    )
-    return translation.text
+    def translate():
+        translation = get_limiter("openai").call(
+            openai_client.audio.translations.create,
+            file=abs_file_path,
+            model="whisper-1",
+            response_format="json",
+        )
+        return {"text": translation.text}
+
+    return transcription_cache.get_or_create(abs_file_path, "translation", translate)["text"]
 
 @st.cache_data(show_spinner=False, hash_funcs={PosixPath: hash_audio_file})
 def openai_transcribe(abs_file_path: Path):
@@ -133,24 +237,9 @@ def deepgram_transcribe(abs_file_path: Path, model: str = "nova-2"):
 
     return response.results.channels[0].alternatives[0], response.results.channels[0].detected_language
 
-def deepgram_transcribe_with_retry(file: Path, model: str = "nova-2", delays=[0, 1, 60, 300, 60, 600]):
-    delay_idx = 0
-
-    while delay_idx < len(delays):
-        try:
-            time.sleep(delays[delay_idx])
-            transcription, language = deepgram_transcribe(file, model=model)
-            return transcription, language
-        except:
-            delay_idx += 1
-            if delay_idx == len(delays):
-                raise Exception(f"Max retries reached. Last error: {traceback.format_exc()}")
-            
-            print(f"Request failed. Retrying in {delays[delay_idx]} seconds...")
-
-    # This line should never be reached due to the exception in the loop,
-    # but it's here for completeness
-    raise Exception("Max retries reached without successful API call")
+def deepgram_transcribe_with_retry(file: Path, model: str = "nova-2"):
+    """Transcribes through the shared Deepgram limiter, which adapts concurrency and retries transient errors."""
+    return get_limiter("deepgram").call(deepgram_transcribe, file, model=model)
 
 def get_adjusted_timestamps(timestamps, start_timestamp, end_timestamp, max_duration):
     exact_start = start_timestamp.start
@@ -0,0 +1,65 @@
+# TranscriptionCache
+
+# STREAMLIT
+from src.hashing import cached_sha256sum
+# /STREAMLIT
+
+from pathlib import Path
+from typing import Callable, Dict, Optional
+import threading
+import json
+import os
+
+# Point this at a mounted volume to share transcriptions across jobs
+TRANSCRIPTION_CACHE_FOLDER = Path(os.environ.get("TRANSCRIPTION_CACHE_FOLDER", "/tmp/transcription_cache"))
+
+class TranscriptionCache:
+    """Stores transcription results as JSON files keyed by the audio's content hash.
+
+    The same footage reused in another story, or a rerun of a story, hashes to the same key
+    no matter where its audio file lives, so it is only transcribed once.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _cache_file(self, audio_file: Path, kind: str) -> Path:
+        return self.folder / f"{cached_sha256sum(Path(audio_file))}_{kind}.json"
+
+    def get(self, audio_file: Path, kind: str) -> Optional[Dict]:
+        cache_file = self._cache_file(audio_file, kind)
+        try:
+            with open(cache_file, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, audio_file: Path, kind: str, data: Dict):
+        cache_file = self._cache_file(audio_file, kind)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f"{cache_file.stem}.{threading.get_ident()}.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(data, f)
+        tmp_file.replace(cache_file)
+
+    def get_or_create(self, audio_file: Path, kind: str, create: Callable[[], Dict]) -> Dict:
+        """Returns the cached data for an audio file, calling create and storing its result on a miss."""
+        data = self.get(audio_file, kind)
+        if data is None:
+            data = create()
+            self.put(audio_file, kind, data)
+        return data
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        return f"Transcription cache: {self.hits} hits, {self.misses} misses ({self.hits / total if total else 0:.0%} hit rate)"
+
+transcription_cache = TranscriptionCache(TRANSCRIPTION_CACHE_FOLDER)
@@ -3,6 +3,7 @@
 # STREAMLIT
 from src.constants import ELEVENLABS_API_KEY
 from src.movie_utils import set_loudness_audio_clip
+from src.loudness import measure_loudness_file
 import streamlit as st
 # /STREAMLIT
 
@@ -54,7 +55,7 @@ def TTS(text, filename, voice_id="LHgN09QqKzsRsniiMpww", previous_text="", next_
     
     audio_clip = mp.AudioFileClip(tmp_file)
     audio_clip = audio_clip.subclip(0, audio_clip.duration - 0.1)
-    audio_clip = set_loudness_audio_clip(audio_clip, lufs)
+    audio_clip = set_loudness_audio_clip(audio_clip, lufs, loudness=measure_loudness_file(tmp_file, 0.0, audio_clip.duration, cache=False))
 
     if start_padding:
         start_pad_clip = create_silent_audio_clip(start_padding)
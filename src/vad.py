@@ -0,0 +1,105 @@
+# VAD
+
+# STREAMLIT
+from src.ffmpeg import get_ffmpeg_binary
+from src.clip_ranges import ClipRange
+from src.probe import probe_media
+# /STREAMLIT
+
+from typing import Iterable, Iterator
+import subprocess
+import tempfile
+
+import numpy as np
+
+RATE = 16000
+FRAME_SAMPLES = 480 # 30 ms
+BLOCK_FRAMES = 2000 # 60 s of audio analysed at a time
+SPEECH_BAND = (300.0, 3400.0)
+
+def read_audio_blocks(clip_range: ClipRange, block_frames: int = BLOCK_FRAMES) -> Iterator[np.ndarray]:
+    """Decodes a range's audio as mono 16 kHz float samples, block_frames frames at a time.
+
+    Raises if FFmpeg fails, so a broken decode isn't mistaken for silence.
+    """
+    command = [get_ffmpeg_binary(), "-v", "error", "-nostdin"]
+    if clip_range.start:
+        command += ["-ss", f"{clip_range.start:.3f}"]
+    command += ["-i", str(clip_range.source_file), "-t", f"{clip_range.duration:.3f}",
+                "-vn", "-ac", "1", "-ar", str(RATE), "-f", "f32le", "-"]
+    block_bytes = block_frames * FRAME_SAMPLES * 4
+    with tempfile.TemporaryFile() as stderr, subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr) as process:
+        try:
+            while True:
+                data = process.stdout.read(block_bytes)
+                if not data:
+                    break
+                yield np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32)
+        finally:
+            if process.poll() is None:
+                process.kill()
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"FFmpeg failed reading audio of {clip_range.source_file} with code {process.returncode}: {stderr.read().decode(errors='replace')}")
+
+def _frame_features(frames: np.ndarray):
+    """Level in dB, voice band energy ratio and voice band spectral flatness of each frame."""
+    frames = frames.astype(np.float64)
+    with np.errstate(divide="ignore"):
+        level = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+
+    power = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SAMPLES), axis=1)) ** 2 + 1e-12
+    frequencies = np.fft.rfftfreq(FRAME_SAMPLES, 1 / RATE)
+    band = (frequencies >= SPEECH_BAND[0]) & (frequencies <= SPEECH_BAND[1])
+    band_ratio = power[:, band].sum(axis=1) / power[:, 1:].sum(axis=1)
+    flatness = np.exp(np.mean(np.log(power[:, band]), axis=1)) / np.mean(power[:, band], axis=1)
+    return level, band_ratio, flatness
+
+def speech_frames(blocks: Iterable[np.ndarray], min_level: float = -55.0, max_level: float = -35.0, noise_margin: float = 6.0,
+                  min_band_ratio: float = 0.5, max_flatness: float = 0.5) -> np.ndarray:
+    """Flags 30 ms frames that look like voice.
+
+    A frame counts when it is louder than an absolute floor and the clip's own noise floor
+    (capped at max_level, so continuous speech isn't its own noise floor), most of its energy
+    is in the voice band, and its spectrum is peaky (harmonics) rather than flat like wind,
+    traffic or crowd noise. Samples are analysed block by block, only the per frame features
+    of the whole clip are kept.
+    """
+    levels, band_ratios, flatnesses = [], [], []
+    remainder = np.zeros(0, dtype=np.float32)
+    for block in blocks:
+        samples = np.concatenate([remainder, block]) if len(remainder) else block
+        num_frames = len(samples) // FRAME_SAMPLES
+        remainder = samples[num_frames * FRAME_SAMPLES:]
+        if not num_frames:
+            continue
+        level, band_ratio, flatness = _frame_features(samples[:num_frames * FRAME_SAMPLES].reshape(num_frames, FRAME_SAMPLES))
+        levels.append(level)
+        band_ratios.append(band_ratio)
+        flatnesses.append(flatness)
+    if not levels:
+        return np.zeros(0, dtype=bool)
+
+    level, band_ratio, flatness = np.concatenate(levels), np.concatenate(band_ratios), np.concatenate(flatnesses)
+    noise_floor = np.percentile(level, 10)
+    threshold = max(min_level, min(noise_floor + noise_margin, max_level))
+    return (level > threshold) & (band_ratio > min_band_ratio) & (flatness < max_flatness)
+
+def speech_duration(blocks: Iterable[np.ndarray], window: float = 0.5, min_fraction: float = 0.5) -> float:
+    """Seconds of audio in windows where most frames are voiced, which ignores isolated clicks."""
+    flags = speech_frames(blocks).astype(np.float64)
+    window_frames = max(int(window * RATE / FRAME_SAMPLES), 1)
+    if len(flags) < window_frames:
+        return 0.0
+    density = np.convolve(flags, np.ones(window_frames) / window_frames, mode="same")
+    return float(np.sum(density >= min_fraction) * FRAME_SAMPLES / RATE)
+
+def has_speech(clip_range: ClipRange, min_speech: float = 0.3) -> bool:
+    """Cheap local check for whether a range is worth sending to transcription.
+
+    Tuned to keep anything that might be speech, a false positive only costs a transcription.
+    A source without an audio stream has no speech, a failing decode raises.
+    """
+    if not probe_media(clip_range.source_file).has_audio:
+        return False
+    return speech_duration(read_audio_blocks(clip_range)) >= min_speech
@@ -3,18 +3,20 @@
 # STREAMLIT
 from src.clip_manager import ClipManager
 from src.news_script import NewsScript, AnchorScriptSection, SOTScriptSection, is_type
-from src.movie_utils import resize_image_clip, cap_loudness, cap_loudness_audio_clip, set_loudness, set_loudness_audio_clip
+from src.movie_utils import resize_image_clip, load_still_image, cap_loudness, cap_loudness_audio_clip, set_loudness, set_loudness_audio_clip, loudness_gain_db
+from src.loudness import measure_loudness_file
 from src.heygen import animate_anchor
+from src.graphics import CroppedOverlay, StaticOverlay, courtesy_overlay, byline_overlay, logline_overlay
+from src.render_profiles import RenderProfile, get_render_profile
 import streamlit as st
 # /STREAMLIT
 
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple, Union
 import traceback
 
 import moviepy.editor as mp
 from moviepy.audio.fx.audio_loop import audio_loop
-from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 
 class VideoEditor:
@@ -29,7 +31,9 @@ class VideoEditor:
                  add_logline: bool = True,
                  add_courtesy: bool = True,
                  logline_padding_ratio=1.0909, dub_volume_lufs=-40,
-                 lower_volume_duration=1.5, dub_delay=0.5, error_handler=None):
+                 lower_volume_duration=1.5, dub_delay=0.5, error_handler=None,
+                 render_backend: str = "moviepy",
+                 render_profile: Optional[Union[str, RenderProfile]] = None):
         self.news_script = news_script
         self.clip_manager = clip_manager
         self.live_anchor = live_anchor
@@ -38,6 +42,13 @@ class VideoEditor:
         self.music_file = music_file
         self.add_logline = add_logline
         self.add_courtesy = add_courtesy
+        if render_profile is not None:
+            # A named profile decides resolution and encoder settings
+            self.render_profile = get_render_profile(render_profile)
+            output_resolution = self.render_profile.resolution
+            bitrate = self.render_profile.bitrate
+        else:
+            self.render_profile = RenderProfile("custom", tuple(output_resolution), bitrate=bitrate)
         self.output_resolution = output_resolution
         self.bitrate = bitrate
         self.font = font
@@ -47,10 +58,25 @@ class VideoEditor:
         self.lower_volume_duration = lower_volume_duration
         self.dub_delay = dub_delay
         self.error_handler = error_handler
+        self.render_backend = render_backend
         self.fps = 29.97
 
     def assemble_video(self, output_file: Path = Path("output.mp4")):
         """Assembles the final video from script sections and B-roll."""
+        if self.render_backend in ("ffmpeg", "ffmpeg-parallel"):
+            self._assemble_video_ffmpeg(output_file, parallel=self.render_backend == "ffmpeg-parallel")
+            return
+        elif self.render_backend != "moviepy":
+            raise ValueError(f"Unknown render backend: {self.render_backend}")
+
+        try:
+            self._assemble_video_moviepy(output_file)
+        finally:
+            # Placements share pooled readers, close them once the file is written
+            self.clip_manager.close_readers()
+
+    def _assemble_video_moviepy(self, output_file: Path):
+        """Assembles the final video with moviepy."""
         video_clips = []
         # STREAMLIT
         progress_bar = st.progress(0.0)
@@ -83,22 +109,40 @@ class VideoEditor:
         if self.error_handler:
             self.error_handler.info("Rendering final video")
         final_video.write_videofile(str(output_file), fps=self.fps, threads=8,
-                                    codec='libx264', audio_codec='aac',
-                                    bitrate=self.bitrate, logger=None)
+                                    audio_codec='aac', logger=None,
+                                    **self.render_profile.moviepy_options())
+        # /STREAMLIT
+
+    def _assemble_video_ffmpeg(self, output_file: Path, parallel: bool = False):
+        """Assembles the final video by compiling the edit into FFmpeg filter graphs.
+
+        With parallel, each section is rendered by its own FFmpeg process and the
+        segments are joined without re-encoding.
+        """
+        from src.ffmpeg_renderer import FFmpegRenderer
+        renderer = FFmpegRenderer(self, work_folder=output_file.parent / "render")
+        # STREAMLIT
+        st.write("Rendering final video file")
         # /STREAMLIT
+        if parallel:
+            renderer.render_sections(output_file)
+        else:
+            renderer.render(output_file)
 
     def _process_sot_section(self, section: SOTScriptSection) -> mp.VideoFileClip:
         """Processes a SOTScriptSection, extracting and resizing the clip."""
-        clip = section.clip.load_video()
+        source = section.clip.source_range
+        clip = self.clip_manager.get_clip_video(section.clip)
         clip = resize_image_clip(clip, self.output_resolution)
-        clip = set_loudness(clip)
+        clip_loudness = measure_loudness_file(source.source_file, source.start, source.end)
+        clip = set_loudness(clip, loudness=clip_loudness)
 
         if section.dub_audio_file is None:
             clip = clip.subclip(section.start, min(section.end, clip.duration))
         else:
             clip = clip.subclip(section.start)
             dub_audio = mp.AudioFileClip(str(section.dub_audio_file))
-            dub_audio = set_loudness_audio_clip(dub_audio)
+            dub_audio = set_loudness_audio_clip(dub_audio, loudness=measure_loudness_file(section.dub_audio_file))
 
             # 1. Calculate the time the dub starts
             dub_start_time = self.lower_volume_duration + self.dub_delay
@@ -109,9 +153,11 @@ class VideoEditor:
 
             # 2. Original audio with fadeout and lower volume
             original_audio = clip.audio
+            rest_loudness = measure_loudness_file(source.source_file, source.start + section.start + self.lower_volume_duration, source.end)
+            rest_loudness += loudness_gain_db(clip_loudness, -23) # already adjusted by set_loudness
             original_audio = mp.concatenate_audioclips([
                 original_audio.subclip(0, self.lower_volume_duration*1.1).audio_fadeout(self.lower_volume_duration*1.1).subclip(0, self.lower_volume_duration),
-                cap_loudness_audio_clip(original_audio.subclip(self.lower_volume_duration, clip.duration), self.dub_volume_lufs).set_start(self.lower_volume_duration)
+                cap_loudness_audio_clip(original_audio.subclip(self.lower_volume_duration, clip.duration), self.dub_volume_lufs, loudness=rest_loudness).set_start(self.lower_volume_duration)
             ])
 
             # 3. Delayed dubbed audio
@@ -178,11 +224,15 @@ class VideoEditor:
         return combined_broll.subclip(0, combined_broll.duration - 0.1)
     
     def _load_and_process_anchor(self, broll_info: Dict, section: AnchorScriptSection) -> mp.VideoFileClip:
-        anchor_clip = mp.VideoFileClip(str(section.anchor_video_file))
-        
         anchor_start = broll_info['start']
         anchor_end = broll_info['end']
 
+        if section.anchor_video_file is None and section.anchor_image_file is not None:
+            anchor_image = load_still_image(str(section.anchor_image_file), tuple(self.output_resolution))
+            return mp.ImageClip(np.array(anchor_image)).set_duration(anchor_end - anchor_start)
+
+        anchor_clip = self.clip_manager.get_reader(section.anchor_video_file)
+
         anchor_clip = anchor_clip.subclip(anchor_start, anchor_end)
         anchor_clip = resize_image_clip(anchor_clip, self.output_resolution)
         return anchor_clip
@@ -190,9 +240,9 @@ class VideoEditor:
     def _load_and_process_broll(self, broll_info: Dict) -> mp.VideoFileClip:
         """Loads, processes (resizing, speed adjustment), and returns a B-roll clip."""
         clip = self.clip_manager.get_clip(broll_info['id'])
-        broll_file = clip.file_path
-        broll_clip = mp.VideoFileClip(str(broll_file))
-        broll_clip = cap_loudness(broll_clip)
+        source = clip.source_range
+        broll_clip = self.clip_manager.get_clip_video(clip)
+        broll_clip = cap_loudness(broll_clip, loudness=measure_loudness_file(source.source_file, source.start, source.end))
 
         broll_start = broll_info['start']
         broll_end = broll_info['end']
@@ -217,213 +267,40 @@ class VideoEditor:
             broll_clip = self._add_courtesy(broll_clip, clip.courtesy)
         return broll_clip
     
+    def _add_overlay(self, clip: mp.VideoFileClip, overlay: CroppedOverlay) -> mp.VideoFileClip:
+        """Blends a static RGBA overlay onto every frame of the given clip."""
+        return clip.fl_image(StaticOverlay(overlay).apply)
+
     def _add_courtesy(self, clip: mp.VideoFileClip, courtesy_text: str) -> mp.VideoFileClip:
         """Adds a courtesy text to the given clip."""
+        return self._add_overlay(clip, self._create_courtesy_overlay(courtesy_text, clip.size))
 
-        output_width, output_height = clip.w, clip.h
-        courtesy_height = int(output_height * (54/1080))
-        courtesy_margin = self.logline_padding
-
-        inner_content_height = int(courtesy_height * (24/54))
-        courtesy_padding = (courtesy_height - inner_content_height) // 2
-
-        courtesy_text_clip = self._create_raw_text_clip(courtesy_text.upper(), inner_content_height, (255, 255, 255, 255))
-        inner_content_width = courtesy_text_clip.w
-        courtesy_width = inner_content_width + courtesy_padding * 2
-
-        courtesy_x = courtesy_margin
-        courtesy_y = courtesy_margin
-
-        bg_clip = (
-            mp.ColorClip(size=(courtesy_width, courtesy_height), color=(0, 5, 52, 255 * 0.5))
-            .set_position(
-                (courtesy_x, courtesy_y)
-            )
-            .set_duration(clip.duration)
-        )
-
-        inner_content_x = courtesy_x + courtesy_padding
-        inner_content_y = courtesy_y + courtesy_padding
-
-        courtesy_text_clip = courtesy_text_clip.set_position(
-            (inner_content_x, inner_content_y)
-        ).set_duration(clip.duration)
-
-        final_elements = [clip, bg_clip, courtesy_text_clip]
-        return mp.CompositeVideoClip(final_elements)
-    
     def _add_byline(self, clip: mp.VideoFileClip, name: str, title: str) -> mp.VideoFileClip:
         """Adds a lower-third byline above the logline to the given clip."""
-
-        output_width, output_height = clip.w, clip.h
-        bottom_margin = 2
-
-        byline_height = int(output_height * (162/1080))
-        inner_content_height = int(byline_height * (82/162))
-        byline_padding = (byline_height - inner_content_height) // 2
-
-        top_inner_content_height = int(inner_content_height * (33/82))
-        bottom_inner_content_height = int(inner_content_height * (25/82))
-        middle_inner_content_spacing = inner_content_height - top_inner_content_height - bottom_inner_content_height
-
-        name_text_clip = self._create_raw_text_clip(name.upper(), top_inner_content_height, (255, 255, 255, 255))
-        title_text_clip = self._create_raw_text_clip(title.upper(), bottom_inner_content_height, (255, 255, 255, 255))
-
-        inner_content_width = max(name_text_clip.w, title_text_clip.w)
-        byline_width = inner_content_width + byline_padding * 2
-
-        byline_x = self.logline_padding
-        logline_height = int(output_height * (150/1080))
-        byline_y = output_height - self.logline_padding - byline_height - logline_height - bottom_margin
-
-        bg_clip = (
-            mp.ColorClip(size=(byline_width, byline_height), color=(0, 5, 52, 255 * 0.9))
-            .set_position(
-                (byline_x, byline_y)
-            )
-            .set_duration(clip.duration)
-        )
-
-        name_x = byline_x + byline_padding
-        name_y = byline_y + byline_padding
-
-        name_text_clip = name_text_clip.set_position(
-            (name_x, name_y)
-        ).set_duration(clip.duration)
-
-        title_x = byline_x + byline_padding
-        title_y = byline_y + byline_padding + top_inner_content_height + middle_inner_content_spacing
-
-        title_text_clip = title_text_clip.set_position(
-            (title_x, title_y)
-        ).set_duration(clip.duration)
-
-        final_elements = [clip, bg_clip, name_text_clip, title_text_clip]
-        return mp.CompositeVideoClip(final_elements)
+        return self._add_overlay(clip, self._create_byline_overlay(name, title, clip.size))
 
     def _add_logline(self, clip: mp.VideoFileClip, logline_text: str) -> mp.VideoFileClip:
         """Adds a lower-third logline to the given clip."""
+        return self._add_overlay(clip, self._create_logline_overlay(logline_text, clip.size))
 
-        output_width, output_height = clip.w, clip.h
-        logo_logline_padding = 2
-
-        # Calculate logline dimensions based on video resolution and padding
-        logline_height = int(output_height * (150/1080))  # 10% of video height
-        logline_width = output_width - self.logline_padding * 2
-        if self.logo_path:
-            logline_width -= logline_height
-            logline_width -= logo_logline_padding
-
-        logline_x = self.logline_padding
-        logline_y = output_height - self.logline_padding - logline_height
-
-        # 1. Create a white background ImageClip
-        bg_clip = (
-            mp.ColorClip(size=(logline_width, logline_height), color=(255, 255, 255, 255 * 0.9))
-            .set_position(
-                (logline_x, logline_y)
-            )
-            .set_duration(clip.duration)
-        )
-
-        # 2. Create text ImageClip
-        text_clip = self._create_text_clip(logline_text.upper(), logline_width, logline_height)
-        text_clip = text_clip.set_position(
-            (logline_x, logline_y)
-        ).set_duration(clip.duration)
-
-        # 3. Load and position logo (if provided)
-        if self.logo_path:
-            logo = (
-                mp.ImageClip(str(self.logo_path))
-                .set_opacity(1.0)
-                .resize(height=logline_height)
-                .set_position(
-                    (logline_x + logline_width + logo_logline_padding, logline_y)
-                )
-                .set_duration(clip.duration)
-            )
-            final_elements = [clip, bg_clip, text_clip, logo]
-        else:
-            final_elements = [clip, bg_clip, text_clip]
-
-        # 4. Compose final clip
-        return mp.CompositeVideoClip(final_elements)
-    
-    def _create_raw_text_clip(self, text: str, height: int, text_color = (0, 0, 0, 255)) -> mp.ImageClip:
-        """Creates a transparent ImageClip with the given text."""
-        ref_text_image = Image.new("RGBA", (1, height), (0, 0, 0, 0))
-        ref_draw = ImageDraw.Draw(ref_text_image)
-
-        def get_font_size_for_height(font_path, desired_height, text):
-            font_size = 1
-            font = ImageFont.truetype(font_path, font_size)
-            text_bbox = ref_draw.textbbox((0, 0), text, font=font)
-            while text_bbox[3] - text_bbox[1] < desired_height:
-                font_size += 1
-                font = ImageFont.truetype(font_path, font_size)
-                text_bbox = ref_draw.textbbox((0, 0), text, font=font)
-            return font_size - 1
-
-        # Load the font
-        if not self.font:
-            font = ImageFont.load_default()
-        else:
-            font_path = str(self.font)
-            font_size = get_font_size_for_height(font_path, height, text)
-            font = ImageFont.truetype(font_path, font_size)
-
-        ref_text_bbox = ref_draw.textbbox((0, 0), text, font=font)
-        ref_text_width = ref_text_bbox[2] - ref_text_bbox[0]
-        text_x = 0
-        text_y = -ref_text_bbox[1]
-
-        text_image = Image.new("RGBA", (ref_text_width, height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(text_image)
-        draw.text((text_x, text_y), text, font=font, fill=text_color)
-        return mp.ImageClip(np.array(text_image))
-
-    def _create_text_clip(self, text: str, width: int, height: int) -> mp.ImageClip:
-        """Creates a transparent ImageClip with the given text."""
-        text_image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(text_image)
-
-        def get_font_size_for_height(font_path, desired_height, text):
-            font_size = 1
-            font = ImageFont.truetype(font_path, font_size)
-            text_bbox = draw.textbbox((0, 0), text, font=font)
-            while text_bbox[3] - text_bbox[1] < desired_height:
-                font_size += 1
-                font = ImageFont.truetype(font_path, font_size)
-                text_bbox = draw.textbbox((0, 0), text, font=font)
-            return font_size - 1
-
-        # Load the font
-        if not self.font:
-            font = ImageFont.load_default()
-        else:
-            font_path = str(self.font)
-            font_size = get_font_size_for_height(font_path, int(height * (59/150)), text)
-            font = ImageFont.truetype(font_path, font_size)
-        
-        reference_char = "H"
-        ref_text_bbox = draw.textbbox((0, 0), reference_char, font=font)
-        ref_text_height = ref_text_bbox[3] - ref_text_bbox[1]
+    def _create_courtesy_overlay(self, courtesy_text: str, size: Tuple[int, int]) -> CroppedOverlay:
+        """Returns the (cached) courtesy graphic, cropped to its visible area."""
+        return courtesy_overlay(courtesy_text, tuple(size), self.logline_padding, self._font_path())
 
-        # Get text size, adjust height, calculate position
-        text_bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1]
-        text_x = self.logline_padding // 2
-        text_y = -ref_text_bbox[1] + (height - ref_text_height) // 2
+    def _create_byline_overlay(self, name: str, title: str, size: Tuple[int, int]) -> CroppedOverlay:
+        """Returns the (cached) byline graphic, cropped to its visible area."""
+        return byline_overlay(name, title, tuple(size), self.logline_padding, self._font_path())
 
-        # Draw the text
-        draw.text((text_x, text_y), text, font=font, fill=(0, 0, 0, 255))
+    def _create_logline_overlay(self, logline_text: str, size: Tuple[int, int]) -> CroppedOverlay:
+        """Returns the (cached) logline graphic, cropped to its visible area."""
+        logo_path = str(self.logo_path) if self.logo_path else None
+        return logline_overlay(logline_text, tuple(size), self.logline_padding, self._font_path(), logo_path)
 
-        return mp.ImageClip(np.array(text_image))
+    def _font_path(self):
+        return str(self.font) if self.font else None
     
     def _add_background_music(self, video: mp.VideoClip) -> mp.VideoClip:
         background_music = mp.AudioFileClip(str(self.music_file))
-        background_music = cap_loudness_audio_clip(background_music, -40)
+        background_music = cap_loudness_audio_clip(background_music, -40, loudness=measure_loudness_file(self.music_file))
         background_music = audio_loop(background_music, duration=video.duration)
         return video.set_audio(mp.CompositeAudioClip([video.audio, background_music]))